@@ -2,18 +2,62 @@ import logging
 
 class BaseConfig:
     """Configurazioni base convalide"""
-    
-    # Configurazione del logger
-    logging.basicConfig(level=logging.INFO)
+
+    # Configurazione del logger (l'output viene attivato da setup_logging)
     logger = logging.getLogger(__name__)
-    
+    LOG_LEVEL = 'INFO'
+
     # Parametri ROS
     ROS_HOST = '172.24.95.73'
     ROS_PORT = 9090
 
     # Parametri SOFA
     GUI = True
-    SIMULATION_STEP = 0.01  
+    SIMULATION_STEP = 0.01
+
+    # Parametri materiale dell'organo
+    YOUNG_MODULUS = 3000
+    POISSON_RATIO = 0.3
+
+    # Vincoli e preprocessing della mesh tetraedrica
+    FIXED_INDICES = [3, 39, 64]  # indici dei vertici fissi, nella numerazione originale della mesh
+    MESH_REORDERING = None  # None, 'rcm' (Reverse Cuthill-McKee) o 'morton' (curva di Morton)
+    FIXED_BOX = None  # [[xmin, ymin, zmin], [xmax, ymax, zmax]]: se impostato sostituisce FIXED_INDICES
+
+    # Elaborazione locale: solo i vertici entro ROI_RADIUS da un link del robot
+    # vengono controllati per i delta (None: tutti i vertici)
+    ROI_RADIUS = None
+    ROI_FULL_PASS_INTERVAL = 50  # ogni N passi tutto l'organo viene controllato, per inviare le deformazioni fuori dalla ROI
+
+    # Strategia del solutore: 'cg' (default, CG non precondizionato), 'auto', 'direct' o 'precomputed'.
+    # 'auto' sceglie precomputed, direct o cg in base al numero di vertici
+    SOLVER_STRATEGY = 'cg'
+    FEM_METHOD = 'large'
+    CG_ITERATIONS = 25
+    CG_TOLERANCE = 1e-9
+    CG_THRESHOLD = 1e-9
+    CG_PRECONDITIONER = None  # None, 'jacobi', 'ssor' o 'ldl'
+    DIRECT_SOLVER = 'ldl'  # 'ldl' o 'cholesky'
+    FACTORIZATION_UPDATE_STEPS = 10  # passi per cui la fattorizzazione viene riutilizzata
+    PRECOMPUTED_MAX_VERTICES = 2000
+    DIRECT_MAX_VERTICES = 20000
+
+    # Passo temporale adattivo in base al residuo del solutore
+    ADAPTIVE_TIME_STEP = False
+    MIN_SIMULATION_STEP = 0.001
+    MAX_SIMULATION_STEP = 0.02
+    TIME_STEP_DECREASE = 0.5
+    TIME_STEP_INCREASE = 1.2
+    SOLVER_REPORT_EVERY = 100
+    SOLVER_HISTORY = 10000  # passi di statistiche del solutore mantenuti in memoria
+
+    # Strumentazione (tracce Chrome e metriche periodiche)
+    TRACE_ENABLED = False
+    TRACE_FILE = 'sofasurgsim_trace.json'
+    TRACE_MAX_EVENTS = 200000
+    METRICS_INTERVAL = 5.0  # secondi tra due snapshot delle metriche
+    METRICS_WINDOW = 1000  # campioni usati per p50/p99
+    TRACE_BYTES_SAMPLE_EVERY = 50  # 1 messaggio ogni N per topic viene serializzato per stimare bytes_published
 
     ORGAN_TOPIC = '/organs'
     ORGAN_TOPIC_TYPE = 'sofa_surgical_msgs/Organ'
@@ -23,9 +67,60 @@ class BaseConfig:
 
     DEFORMATION_THRESHOLD = 0.001
 
+    # Stream keyframe + delta delle deformazioni. Disattivato di default perché cambia il formato sul filo:
+    # richiede in sofa_surgical_msgs i campi sequence/keyframe_sequence di DeformationUpdate,
+    # il messaggio DeformationKeyframe e il servizio GetOrganState (vedi README)
+    DEFORMATION_KEYFRAMES = False
+    KEYFRAME_TOPIC_PREFIX = '/deformation_keyframes_'
+    KEYFRAME_TOPIC_TYPE = 'sofa_surgical_msgs/DeformationKeyframe'
+    KEYFRAME_INTERVAL = 100  # delta massimi tra due keyframe
+    KEYFRAME_PERIOD = 1.0  # secondi massimi tra due keyframe
+    KEYFRAME_DTYPE = '<f4'
+    ORGAN_STATE_SERVICE = '/get_organ_state'
+    ORGAN_STATE_SERVICE_TYPE = 'sofa_surgical_msgs/GetOrganState'
+
+    # Trasporto su memoria condivisa per i consumatori sulla stessa macchina
+    SHM_ENABLED = False
+    SHM_PREFIX = 'sofasurgsim'
+    SHM_SLOTS = 8
+    DEFORMATION_TOPIC_PREFIX = '/deformation_updates_'
+    DEFORMATION_TOPIC_TYPE = 'sofa_surgical_msgs/DeformationUpdate'
+    ROBOT_POSE_TOPIC_PREFIX = '/robot_poses_'
+    # Tipi dei payload densi su memoria condivisa, distinti dai messaggi ROS dello stesso topic
+    SHM_DEFORMATION_TYPE = 'sofasurgsim/DenseDisplacement'  # (n_vertici, 3) spostamenti dalla posizione di riposo
+    SHM_ROBOT_POSE_TYPE = 'sofasurgsim/LinkPoses'  # (n_link, 7) posizione + quaternione, etichette = nomi dei link
+
     ROBOT_SERVICE = '/load_robot_from_urdf'
     ROBOT_SERVICE_TYPE = 'sofa_surgical_msgs/LoadRobotFromURDF'
 
+    # Parametri batch runner
+    BATCH_STEPS = 500
+    BATCH_RECORD_EVERY = 10
+    BATCH_OUTPUT_DIR = 'batch_results'
 
-config = BaseConfig()
+    def __init__(self, **overrides):
+        """
+        Create a configuration, optionally overriding some of the class defaults.
+        Used by the batch runner to give each worker its own parameters.
+        Args:
+            **overrides: Parameter names (e.g. YOUNG_MODULUS) and their values
+        """
+        for key, value in overrides.items():
+            if not hasattr(type(self), key):
+                raise ValueError(f"Unknown configuration parameter: {key}")
+            setattr(self, key, value)
+
+    def to_dict(self):
+        """Converts the public (upper case) parameters to a dictionary."""
+        return {
+            key: getattr(self, key)
+            for key in dir(self) if key.isupper()
+        }
 
+
+def setup_logging(level=None):
+    """Configure the root logger; called by the entry points instead of at import time."""
+    logging.basicConfig(level=level if level else BaseConfig.LOG_LEVEL)
+
+
+config = BaseConfig()
@@ -0,0 +1,95 @@
+import sys
+import os
+import json
+import argparse
+import itertools
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sofasurgsim.batch.runner import BatchRunner
+from sofasurgsim.msg.Organ import Organ
+from sofasurgsim.msg.Robot import Robot
+from config.base_config import config as cfg, setup_logging
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Esegue più simulazioni SOFA headless in parallelo.")
+    parser.add_argument('--young-modulus', type=float, nargs='+', default=[cfg.YOUNG_MODULUS])
+    parser.add_argument('--poisson-ratio', type=float, nargs='+', default=[cfg.POISSON_RATIO])
+    parser.add_argument('--mesh-reordering', nargs='+', default=[cfg.MESH_REORDERING],
+                        type=lambda value: None if value == 'none' else value,
+                        help="Metodi di riordino da confrontare: none, rcm, morton")
+    parser.add_argument('--steps', type=int, default=cfg.BATCH_STEPS)
+    parser.add_argument('--record-every', type=int, default=cfg.BATCH_RECORD_EVERY)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--scaling-sweep', type=int, nargs='+', default=None, metavar='N',
+                        help="Ripete i job con questi numeri di worker e scrive scaling.json (es. 1 2 4 8)")
+    parser.add_argument('--output-dir', default=cfg.BATCH_OUTPUT_DIR)
+    parser.add_argument('--scene-file', default=None,
+                        help="JSON con le risposte di /get_organ e /load_robot_from_urdf ({'organ': ..., 'robot': ...}). "
+                             "Se assente, la scena viene scaricata una volta tramite ROS.")
+    return parser.parse_args()
+
+
+def load_scene(scene_file):
+    """Load organ and robot either from a JSON file or, once, from the ROS services."""
+    if scene_file:
+        with open(scene_file) as f:
+            data = json.load(f)
+        return data['organ'], data['robot']
+
+    from sofasurgsim.interfaces.ros_interface import ROSClient
+    ros_client = ROSClient(cfg.ROS_HOST, cfg.ROS_PORT)
+    ros_client.connect()
+    try:
+        organ_msg = ros_client.use_service(cfg.ORGANS_SERVICE, cfg.ORGANS_SERVICE_TYPE, 'organ')
+        robot_msg = ros_client.use_service(cfg.ROBOT_SERVICE, cfg.ROBOT_SERVICE_TYPE, 'robot')
+    finally:
+        ros_client.disconnect()
+    return organ_msg, robot_msg
+
+
+def print_reordering_comparison(results):
+    """Mean step time of each mesh reordering method, relative to the first one."""
+    step_times = {}
+    for result in results:
+        method = result['overrides']['MESH_REORDERING']
+        step_times.setdefault(method, []).append(1.0 / result['steps_per_second'])
+
+    baseline_method = next(iter(step_times))
+    baseline = sum(step_times[baseline_method]) / len(step_times[baseline_method])
+    for method, times in step_times.items():
+        mean = sum(times) / len(times)
+        print(f"reordering {method}: {mean * 1e3:.2f} ms/step ({100 * (baseline - mean) / baseline:+.1f}% vs {baseline_method})")
+
+
+def main():
+    setup_logging()
+    args = parse_args()
+    organ_msg, robot_msg = load_scene(args.scene_file)
+
+    overrides_list = [
+        {'YOUNG_MODULUS': young_modulus, 'POISSON_RATIO': poisson_ratio, 'MESH_REORDERING': reordering}
+        for young_modulus, poisson_ratio, reordering in itertools.product(
+            args.young_modulus, args.poisson_ratio, args.mesh_reordering)
+    ]
+
+    runner = BatchRunner(Organ.from_dict(organ_msg), Robot.from_dict(robot_msg), n_workers=args.workers)
+    if args.scaling_sweep:
+        for entry in runner.scaling_sweep(overrides_list, args.scaling_sweep, n_steps=args.steps,
+                                          record_every=args.record_every, output_dir=args.output_dir):
+            print(f"{entry['n_workers']} workers: {entry['steps_per_second']:.1f} steps/s "
+                  f"(speedup {entry['speedup']:.2f}, efficiency {100 * entry['efficiency']:.0f}%)")
+        return
+
+    results = runner.run(overrides_list, n_steps=args.steps, record_every=args.record_every, output_dir=args.output_dir)
+
+    for result in results:
+        print(f"job {result['job_id']}: {result['overrides']} -> {result['output']} "
+              f"({result['steps_per_second']:.1f} steps/s)")
+
+    if len(args.mesh_reordering) > 1:
+        print_reordering_comparison(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,44 @@
+import time
+_START = time.perf_counter()  # inizio del processo, per il report di avvio
+
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from sofasurgsim.interfaces.ros_interface import ROSClient
 from sofasurgsim.interfaces.sofa_interface import SOFASceneController
-from config.base_config import config as cfg
+from sofasurgsim.interfaces.shm_interface import SharedMemoryClient
+from sofasurgsim.utils.startup import startup_report
+from config.base_config import config as cfg, setup_logging
 
 def callback(message):
     """Funzione di callback per la ricezione di messaggi."""
     print("Received:", message)
 
 def main():
-   
-    ros_client = ROSClient(cfg.ROS_HOST)
-    ros_client.connect()
+    setup_logging()
+    startup_report.set_start(_START)
+    startup_report.add('import', time.perf_counter() - _START)
+
+    # roslibpy (twisted/autobahn) viene importato qui, alla creazione del client
+    with startup_report.phase('import'):
+        ros_client = ROSClient(cfg.ROS_HOST)
+    with startup_report.phase('connect'):
+        ros_client.connect()
+
+    # Trasporto su memoria condivisa per i consumatori sulla stessa macchina
+    shm_client = SharedMemoryClient() if cfg.SHM_ENABLED else None
+    if shm_client:
+        shm_client.connect()
     
     # Avvio della simulazione
-    sofa_controller = SOFASceneController(ros_client)
+    sofa_controller = SOFASceneController(ros_client, shm_client=shm_client)
     sofa_controller.run_simulation()
     
     # Il codice qui sotto non verrà eseguito finché la simulazione è attiva.
     ros_client.disconnect()
+    if shm_client:
+        shm_client.disconnect()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import multiprocessing
+import numpy as np
+
+from config.base_config import BaseConfig, config as cfg, setup_logging
+from sofasurgsim.utils.tracing import tracer
+from sofasurgsim.batch.shared_meshes import (SharedMeshStore, organ_to_arrays, organ_from_arrays,
+                                             organ_reordering_arrays, robot_to_arrays, robot_from_arrays)
+
+# Variabili che limitano i thread delle librerie numeriche di ogni worker
+THREAD_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+# Stato del processo worker, inizializzato una sola volta da _init_worker
+_worker_state = {}
+
+
+def _init_worker(layout, organ_metadata, robot_metadata):
+    """Attach to the shared meshes once per worker process; the meshes stay views of the shared block."""
+    setup_logging()
+    store = SharedMeshStore.attach(layout)
+    arrays = store.arrays()
+    _worker_state['store'] = store
+    _worker_state['arrays'] = arrays
+    _worker_state['organ_metadata'] = organ_metadata
+    _worker_state['robot'] = robot_from_arrays(robot_metadata, arrays)
+
+
+def _run_job(job):
+    """
+    Run a single headless simulation in the current worker process.
+    Args:
+        job (dict): job_id, overrides, n_steps, record_every, output_dir
+    Returns:
+        dict: compact summary of the run
+    """
+    import Sofa
+    from sofasurgsim.interfaces.sofa_interface import SOFASceneController
+
+    job_cfg = BaseConfig(**{'GUI': False, 'SOLVER_HISTORY': job['n_steps'], **job['overrides']})
+    # Mesh tetraedrica già riordinata dal processo padre con il metodo del job
+    organ = organ_from_arrays(_worker_state['organ_metadata'], _worker_state['arrays'], job_cfg.MESH_REORDERING)
+    controller = SOFASceneController(None, config=job_cfg)
+    root_node = controller._create_scene(organ=organ, robot=_worker_state['robot'])
+    Sofa.Simulation.init(root_node)
+
+    organ_id = organ.id
+    dofs = root_node.getChild(organ_id).getObject('dofs')
+
+    samples = []
+    sample_times = []
+    start = time.perf_counter()
+    for step in range(job['n_steps']):
+        Sofa.Simulation.animate(root_node, root_node.dt.value)
+        if step % job['record_every'] == 0 or step == job['n_steps'] - 1:
+            samples.append(dofs.position.array().astype(np.float32))
+            sample_times.append(root_node.time.value)
+    wall_time = time.perf_counter() - start
+
+    output_path = os.path.join(job['output_dir'], f"job_{job['job_id']:05d}.npz")
+    np.savez_compressed(
+        output_path,
+        positions=controller.permutations[organ_id].positions_to_original(np.stack(samples)),
+        times=np.asarray(sample_times, dtype=np.float64),
+        solver_iterations=np.asarray(controller.solver_manager.iterations, dtype=np.int32),
+        solver_residuals=np.asarray(controller.solver_manager.residuals, dtype=np.float64),
+        time_steps=np.asarray(controller.solver_manager.time_steps, dtype=np.float64),
+        overrides=json.dumps(job['overrides']),
+        wall_time=wall_time
+    )
+    Sofa.Simulation.unload(root_node)
+
+    # I worker vengono terminati dal pool senza eseguire atexit: la traccia (cumulativa, un file per processo)
+    # viene scritta alla fine di ogni job
+    if tracer.enabled:
+        tracer.export_chrome_trace()
+
+    return {
+        'job_id': job['job_id'],
+        'overrides': job['overrides'],
+        'output': output_path,
+        'wall_time': wall_time,
+        'mean_solver_iterations': float(np.mean(controller.solver_manager.iterations)) if job['n_steps'] else 0.0,
+        'steps_per_second': job['n_steps'] / wall_time if wall_time > 0 else float('inf')
+    }
+
+
+class BatchRunner:
+    """
+    Runs many independent headless simulations of the same organ/robot scene
+    across a process pool. Meshes are shared with the workers through shared
+    memory and every job gets its own BaseConfig built from its overrides.
+    """
+
+    def __init__(self, organ, robot, n_workers=None, config=None):
+        self.config = config if config else cfg
+        self.organ = organ
+        self.robot = robot
+        self.n_workers = n_workers if n_workers else os.cpu_count()
+
+    def _run_pool(self, jobs, n_workers):
+        """Run the jobs on a fresh pool of n_workers processes; returns (results, elapsed seconds)."""
+        organ_metadata, organ_arrays = organ_to_arrays(self.organ)
+        robot_metadata, robot_arrays = robot_to_arrays(self.robot)
+
+        # Il riordino è deterministico: calcolato una volta per metodo e condiviso con tutti i job
+        methods = {BaseConfig(**job['overrides']).MESH_REORDERING for job in jobs}
+        reordered_arrays, reports = organ_reordering_arrays(organ_arrays, methods)
+        for method, report in reports.items():
+            self.config.logger.info(f"Mesh {self.organ.id} reordered with {method}: bandwidth "
+                                    f"{report['bandwidth_before']} -> {report['bandwidth_after']}")
+        store = SharedMeshStore.create({**organ_arrays, **reordered_arrays, **robot_arrays})
+
+        # Un solo thread per worker: il parallelismo è dato dal numero di processi.
+        # Le variabili vanno impostate nel padre: i processi "spawn" le ereditano
+        # all'avvio, prima di importare numpy e SOFA
+        previous = {var: os.environ.get(var) for var in THREAD_VARS}
+        os.environ.update({var: '1' for var in THREAD_VARS})
+
+        start = time.perf_counter()
+        try:
+            # "spawn": SOFA non è fork-safe
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(n_workers, initializer=_init_worker,
+                              initargs=(store.layout, organ_metadata, robot_metadata)) as pool:
+                results = pool.map(_run_job, jobs, chunksize=1)
+        finally:
+            for var, value in previous.items():
+                if value is None:
+                    os.environ.pop(var, None)
+                else:
+                    os.environ[var] = value
+            store.close()
+        return results, time.perf_counter() - start
+
+    def _prepare(self, overrides_list, n_steps, record_every, output_dir):
+        """Validate the overrides and build the job descriptions."""
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Valida le configurazioni prima di avviare i worker
+        for overrides in overrides_list:
+            BaseConfig(**overrides)
+
+        return [
+            {'job_id': i, 'overrides': overrides, 'n_steps': n_steps,
+             'record_every': record_every, 'output_dir': output_dir}
+            for i, overrides in enumerate(overrides_list)
+        ]
+
+    def run(self, overrides_list, n_steps=None, record_every=None, output_dir=None):
+        """
+        Run one simulation per entry of overrides_list.
+        Args:
+            overrides_list (list[dict]): BaseConfig overrides for each job
+            n_steps (int): Steps per simulation
+            record_every (int): Sampling period (in steps) of the organ positions
+            output_dir (str): Directory where the per-job .npz results are written
+        Returns:
+            list[dict]: Job summaries, in the same order as overrides_list
+        """
+        n_steps = n_steps if n_steps else self.config.BATCH_STEPS
+        record_every = record_every if record_every else self.config.BATCH_RECORD_EVERY
+        output_dir = output_dir if output_dir else self.config.BATCH_OUTPUT_DIR
+        jobs = self._prepare(overrides_list, n_steps, record_every, output_dir)
+
+        self.config.logger.info(f"Running {len(jobs)} simulations on {self.n_workers} workers")
+        results, elapsed = self._run_pool(jobs, self.n_workers)
+
+        total_steps = n_steps * len(jobs)
+        throughput = total_steps / elapsed if elapsed > 0 else float('inf')
+        self.config.logger.info(f"Batch completed in {elapsed:.2f}s ({throughput:.1f} steps/s overall)")
+
+        with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+            json.dump({
+                'elapsed': elapsed,
+                'n_workers': self.n_workers,
+                'total_steps': total_steps,
+                'steps_per_second': throughput,
+                'steps_per_second_per_worker': throughput / self.n_workers,
+                'jobs': results
+            }, f, indent=2)
+
+        return results
+
+    def scaling_sweep(self, overrides_list, worker_counts, n_steps=None, record_every=None, output_dir=None):
+        """
+        Run the same jobs with different numbers of workers and measure the throughput.
+        The speedup and parallel efficiency are relative to the smallest worker count;
+        the results are written to scaling.json in output_dir.
+        Args:
+            overrides_list (list[dict]): BaseConfig overrides for each job
+            worker_counts (list[int]): Pool sizes to measure, e.g. [1, 2, 4, 8]
+        Returns:
+            list[dict]: n_workers, elapsed, steps_per_second, speedup and efficiency of each pool size
+        """
+        n_steps = n_steps if n_steps else self.config.BATCH_STEPS
+        record_every = record_every if record_every else self.config.BATCH_RECORD_EVERY
+        output_dir = output_dir if output_dir else self.config.BATCH_OUTPUT_DIR
+        jobs = self._prepare(overrides_list, n_steps, record_every, output_dir)
+        total_steps = n_steps * len(jobs)
+
+        sweep = []
+        for n_workers in sorted(worker_counts):
+            self.config.logger.info(f"Scaling sweep: {len(jobs)} simulations on {n_workers} workers")
+            _, elapsed = self._run_pool(jobs, n_workers)
+            sweep.append({'n_workers': n_workers, 'elapsed': elapsed,
+                          'steps_per_second': total_steps / elapsed if elapsed > 0 else float('inf')})
+
+        baseline = sweep[0]
+        for entry in sweep:
+            entry['speedup'] = entry['steps_per_second'] / baseline['steps_per_second']
+            entry['efficiency'] = entry['speedup'] * baseline['n_workers'] / entry['n_workers']
+            self.config.logger.info(f"{entry['n_workers']} workers: {entry['steps_per_second']:.1f} steps/s, "
+                                    f"speedup {entry['speedup']:.2f}, efficiency {100 * entry['efficiency']:.0f}%")
+
+        with open(os.path.join(output_dir, 'scaling.json'), 'w') as f:
+            json.dump({'total_steps': total_steps, 'n_jobs': len(jobs), 'sweep': sweep}, f, indent=2)
+
+        return sweep
@@ -0,0 +1,179 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+from sofasurgsim.msg.Organ import Pose, Organ
+from sofasurgsim.msg.Robot import Robot, RobotLink, RobotJoint
+from sofasurgsim.utils.mesh_reordering import MeshPermutation, reorder_tetrahedral_mesh
+
+
+class ArrayMesh:
+    """
+    Mesh backed by NumPy arrays (typically zero-copy views of a SharedMeshStore).
+    Stands in for Mesh and TetrahedralMesh when building the SOFA scene, which
+    only needs to_arrays(), so workers never rebuild per-vertex Python objects.
+    Attributes:
+        permutation (MeshPermutation): Set when the arrays are already reordered, so that
+                                       the scene uses them as they are instead of reordering again
+    """
+
+    def __init__(self, vertices, elements, permutation=None):
+        self.vertices = vertices
+        self.elements = elements
+        self.permutation = permutation
+
+    def to_arrays(self):
+        """Returns the (vertices, triangles or tetrahedra) arrays."""
+        return self.vertices, self.elements
+
+
+def organ_to_arrays(organ: Organ):
+    """
+    Split an Organ into a small metadata dictionary and its mesh arrays.
+    Returns:
+        (dict, dict): metadata and a name -> np.ndarray mapping
+    """
+    arrays = {}
+    if organ.surface:
+        arrays['organ/surface/vertices'], arrays['organ/surface/triangles'] = organ.surface.to_arrays()
+    if organ.tetrahedral_mesh:
+        arrays['organ/tetra/vertices'], arrays['organ/tetra/tetrahedra'] = organ.tetrahedral_mesh.to_arrays()
+    metadata = {'id': organ.id, 'pose': organ.pose.to_dict()}
+    return metadata, arrays
+
+
+def organ_reordering_arrays(arrays, methods):
+    """
+    Reorder the tetrahedral mesh once for each method, so that the jobs sharing a
+    method reuse the same (deterministic) permutation instead of recomputing it.
+    Args:
+        arrays (dict): Output of organ_to_arrays
+        methods (iterable): MESH_REORDERING values used by the jobs
+    Returns:
+        (dict, dict): name -> np.ndarray of the reordered meshes and method -> bandwidth report
+    """
+    reordered = {}
+    reports = {}
+    if 'organ/tetra/vertices' not in arrays:
+        return reordered, reports
+    for method in methods:
+        if method is None:
+            continue
+        vertices, tetrahedra, permutation, reports[method] = reorder_tetrahedral_mesh(
+            arrays['organ/tetra/vertices'], arrays['organ/tetra/tetrahedra'], method)
+        prefix = f'organ/tetra/{method}'
+        reordered[f'{prefix}/vertices'] = vertices
+        reordered[f'{prefix}/tetrahedra'] = tetrahedra.astype(np.int32)
+        reordered[f'{prefix}/new_to_old'] = permutation.new_to_old
+    return reordered, reports
+
+
+def organ_from_arrays(metadata, arrays, reordering=None):
+    """
+    Rebuilds an Organ from the output of organ_to_arrays, with ArrayMesh meshes over the given arrays.
+    Args:
+        reordering (str): Use the tetrahedral mesh reordered by organ_reordering_arrays with this method
+    """
+    surface = None
+    if 'organ/surface/vertices' in arrays:
+        surface = ArrayMesh(arrays['organ/surface/vertices'], arrays['organ/surface/triangles'])
+    tetrahedral_mesh = None
+    if reordering is not None and f'organ/tetra/{reordering}/vertices' in arrays:
+        prefix = f'organ/tetra/{reordering}'
+        tetrahedral_mesh = ArrayMesh(arrays[f'{prefix}/vertices'], arrays[f'{prefix}/tetrahedra'],
+                                     permutation=MeshPermutation(arrays[f'{prefix}/new_to_old']))
+    elif 'organ/tetra/vertices' in arrays:
+        tetrahedral_mesh = ArrayMesh(arrays['organ/tetra/vertices'], arrays['organ/tetra/tetrahedra'])
+    return Organ(id=metadata['id'], pose=Pose.from_dict(metadata['pose']),
+                 surface=surface, tetrahedral_mesh=tetrahedral_mesh)
+
+
+def robot_to_arrays(robot: Robot):
+    """
+    Split a Robot into a small metadata dictionary and its link mesh arrays.
+    Returns:
+        (dict, dict): metadata and a name -> np.ndarray mapping
+    """
+    arrays = {}
+    links = []
+    for link in robot.links:
+        links.append({'name': link.name, 'has_collision': link.collision_mesh is not None})
+        prefix = f'robot/{link.name}'
+        arrays[f'{prefix}/visual/vertices'], arrays[f'{prefix}/visual/triangles'] = link.visual_mesh.to_arrays()
+        if link.collision_mesh:
+            arrays[f'{prefix}/collision/vertices'], arrays[f'{prefix}/collision/triangles'] = link.collision_mesh.to_arrays()
+    metadata = {
+        'name': robot.name,
+        'links': links,
+        'joints': [joint.to_dict() for joint in robot.joints]
+    }
+    return metadata, arrays
+
+
+def robot_from_arrays(metadata, arrays):
+    """Rebuilds a Robot from the output of robot_to_arrays, with ArrayMesh link meshes."""
+    links = []
+    for link in metadata['links']:
+        prefix = f"robot/{link['name']}"
+        visual_mesh = ArrayMesh(arrays[f'{prefix}/visual/vertices'], arrays[f'{prefix}/visual/triangles'])
+        collision_mesh = None
+        if link['has_collision']:
+            collision_mesh = ArrayMesh(arrays[f'{prefix}/collision/vertices'], arrays[f'{prefix}/collision/triangles'])
+        links.append(RobotLink(name=link['name'], visual_mesh=visual_mesh, collision_mesh=collision_mesh))
+    joints = [RobotJoint.from_dict(joint) for joint in metadata['joints']]
+    return Robot(name=metadata['name'], links=links, joints=joints)
+
+
+class SharedMeshStore:
+    """
+    Packs named NumPy arrays into a single shared memory block.
+    The owner process creates the store and passes `layout` (a small picklable
+    dictionary) to the workers, which attach to the same block without copying.
+    """
+
+    def __init__(self, shm, layout, owner):
+        self.shm = shm
+        self.layout = layout
+        self.owner = owner
+
+    @staticmethod
+    def create(arrays):
+        """
+        Create a shared memory block holding all the given arrays.
+        Args:
+            arrays (dict): name -> np.ndarray
+        """
+        layout = {'arrays': {}}
+        offset = 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            offset = (offset + 63) & ~63  # cache line alignment
+            layout['arrays'][name] = (offset, array.dtype.str, array.shape)
+            offset += array.nbytes
+
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        layout['name'] = shm.name
+        store = SharedMeshStore(shm, layout, owner=True)
+        for name, array in arrays.items():
+            store.get(name)[...] = array
+        return store
+
+    @staticmethod
+    def attach(layout):
+        """Attach to a store created by another process."""
+        shm = shared_memory.SharedMemory(name=layout['name'])
+        return SharedMeshStore(shm, layout, owner=False)
+
+    def get(self, name):
+        """Returns a zero-copy view of the named array."""
+        offset, dtype, shape = self.layout['arrays'][name]
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.shm.buf, offset=offset)
+
+    def arrays(self):
+        """Returns views of all the arrays in the store."""
+        return {name: self.get(name) for name in self.layout['arrays']}
+
+    def close(self):
+        """Detach from the store; the owner also frees the shared memory."""
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
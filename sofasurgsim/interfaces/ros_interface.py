@@ -1,13 +1,20 @@
-import roslibpy
+import json
+from sofasurgsim.utils.lazy_import import lazy_import
+from sofasurgsim.utils.tracing import tracer
 from config.base_config import config as cfg
 
+# roslibpy (twisted/autobahn) viene importato solo al primo utilizzo
+roslibpy = lazy_import('roslibpy')
+
 
 class ROSClient:
     def __init__(self, host='localhost', port=9090):
         self.client = roslibpy.Ros(host=host, port=port)
         self.publishers = {}
         self.subscribers = {}
+        self.services = {}
         self.publishing_threads = {}
+        self.published_counts = {}  # messaggi pubblicati per topic (solo con il tracing attivo)
         self.running = False
 
         # create a subscriber to visualize rosbridge log messages
@@ -26,6 +33,8 @@ class ROSClient:
             thread.join()  # Wait for threads to finish
         for pub in self.publishers.values():
             pub.unadvertise()
+        for service in self.services.values():
+            service.unadvertise()
         self.client.close()
         cfg.logger.info("Disconnected")
 
@@ -61,10 +70,21 @@ class ROSClient:
             msg_type (str): ROS message type
             message_data (dict): Initial message data
         """
-        talker = roslibpy.Topic(self.client, topic_name, msg_type)
+        with tracer.span('ros.publish'):
+            talker = roslibpy.Topic(self.client, topic_name, msg_type)
+
+            talker.publish(roslibpy.Message(message_data))
+            talker.unadvertise()
 
-        talker.publish(roslibpy.Message(message_data))
-        talker.unadvertise()
+        if tracer.enabled:
+            tracer.count('messages_published')
+            # Stima dei byte a campione: un messaggio ogni TRACE_BYTES_SAMPLE_EVERY per topic
+            # viene serializzato, fuori dallo span, e pesato per il periodo di campionamento
+            sample_every = max(int(cfg.TRACE_BYTES_SAMPLE_EVERY), 1)
+            count = self.published_counts.get(topic_name, 0)
+            self.published_counts[topic_name] = count + 1
+            if count % sample_every == 0:
+                tracer.count('bytes_published', len(json.dumps(message_data)) * sample_every)
 
     def use_service(self, service_name, service_type, key_word):
         """
@@ -80,3 +100,23 @@ class ROSClient:
         cfg.logger.info(f"Service {type(result)} called")
         
         return result[key_word]
+
+    def advertise_service(self, service_name, service_type, handler):
+        """
+        Provide a service.
+        Args:
+            service_name (str): Service name
+            service_type (str): ROS service type
+            handler (function): Called as handler(request, response); fills response and returns True on success
+        """
+        def wrapped_handler(request, response):
+            try:
+                return handler(request, response)
+            except Exception as e:
+                cfg.logger.error(f"Error in handler for service {service_name}: {str(e)}")
+                return False
+
+        service = roslibpy.Service(self.client, service_name, service_type)
+        service.advertise(wrapped_handler)
+        self.services[service_name] = service
+        cfg.logger.info(f"Service {service_name} advertised")
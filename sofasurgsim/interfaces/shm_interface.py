@@ -0,0 +1,64 @@
+import time
+import numpy as np
+
+from sofasurgsim.interfaces.shm_ring import RingWriter, segment_name
+from sofasurgsim.utils.tracing import tracer
+from config.base_config import config as cfg
+
+
+class SharedMemoryClient:
+    """
+    Same-host transport with the publish API of ROSClient.
+    Every topic is a shared memory ring buffer (see shm_ring) created on the first
+    publish and sized from that message; consumers on the same machine read it with
+    RingReader, while rosbridge stays available for remote consumers.
+    """
+
+    def __init__(self, config=None):
+        self.config = config if config else cfg
+        self.writers = {}
+        self.running = False
+
+    def connect(self):
+        """Enable publishing."""
+        self.running = True
+        self.config.logger.info("Shared memory transport enabled")
+
+    def disconnect(self):
+        """Destroy all the ring buffers."""
+        self.running = False
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+        self.config.logger.info("Shared memory transport closed")
+
+    def create_publisher(self, topic_name, msg_type, message_data, labels=None, timestamp=None):
+        """
+        Publish a message on a topic.
+        Args:
+            topic_name (str): Topic name
+            msg_type (str): Message type, stored in the ring buffer metadata
+            message_data (np.ndarray): Message payload; its shape must not change between messages
+            labels (list[str]): Optional names of the payload rows (e.g. robot links), stored on creation
+            timestamp (float): Time of the message, time.time() by default
+        """
+        if not self.running:
+            return
+
+        with tracer.span('shm.publish'):
+            writer = self.writers.get(topic_name)
+            if writer is None:
+                writer = RingWriter(
+                    segment_name(topic_name, self.config.SHM_PREFIX),
+                    message_data.shape,
+                    message_data.dtype,
+                    self.config.SHM_SLOTS,
+                    metadata={'topic': topic_name, 'msg_type': msg_type, 'labels': labels}
+                )
+                self.writers[topic_name] = writer
+                self.config.logger.info(f"Shared memory publisher for {topic_name}: {writer.name}")
+
+            writer.write(message_data, timestamp if timestamp is not None else time.time())
+
+        if tracer.enabled:
+            tracer.count('bytes_shm', np.asarray(message_data).nbytes)
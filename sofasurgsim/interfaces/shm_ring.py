@@ -0,0 +1,281 @@
+"""
+Shared memory ring buffer used by the same-host transport.
+This module only depends on NumPy and the standard library, so that renderer and
+force-estimation nodes can read the simulation streams without SOFA or roslibpy.
+
+Layout of a segment:
+    header   (128 bytes): magic, version, n_slots, slot stride, payload size, ndim,
+                          shape (4 dims), write count, metadata size, dtype string
+    metadata (METADATA_SIZE bytes): JSON (topic, message type, labels, ...)
+    slots    (n_slots * stride): [sequence uint64][timestamp float64][payload]
+
+Every slot is protected by a seqlock: while message k is being written the slot
+sequence is 2k+1, once written it is 2k+2. A reader accepts a slot only if the
+sequence is the expected even value before and after reading the payload.
+"""
+import re
+import sys
+import json
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+MAGIC = 0x314d48534652534f  # b"OSRFSHM1" little endian
+VERSION = 1
+HEADER_SIZE = 128
+METADATA_SIZE = 4096
+SLOT_HEADER_SIZE = 16
+MAX_DIMS = 4
+
+# Indici dei campi uint64 dell'header
+_MAGIC, _VERSION, _SLOTS, _STRIDE, _PAYLOAD, _NDIM, _SHAPE = 0, 1, 2, 3, 4, 5, 6
+_WRITE_COUNT = _SHAPE + MAX_DIMS
+_METADATA_LEN = _WRITE_COUNT + 1
+_DTYPE_OFFSET = 8 * (_METADATA_LEN + 1)
+_DTYPE_SIZE = HEADER_SIZE - _DTYPE_OFFSET
+
+# Segmenti creati da RingWriter in questo processo (tracciati dal resource tracker)
+_owned_segments = set()
+
+
+def segment_name(topic_name, prefix='sofasurgsim'):
+    """Shared memory segment name of a topic, e.g. /robot_poses_psm -> sofasurgsim_robot_poses_psm."""
+    return f"{prefix}_{re.sub(r'[^A-Za-z0-9_]', '_', topic_name).strip('_')}"
+
+
+def _attach(name):
+    """Attach to an existing segment without letting this process' resource tracker destroy it at exit."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if name not in _owned_segments:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+class _Segment:
+    """Typed views over a ring buffer segment."""
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray(_METADATA_LEN + 1, dtype=np.uint64, buffer=shm.buf, offset=0)
+        if int(self.header[_MAGIC]) != MAGIC or int(self.header[_VERSION]) != VERSION:
+            raise ValueError(f"{shm.name} is not a sofasurgsim ring buffer")
+
+        self.n_slots = int(self.header[_SLOTS])
+        self.stride = int(self.header[_STRIDE])
+        ndim = int(self.header[_NDIM])
+        self.shape = tuple(int(d) for d in self.header[_SHAPE:_SHAPE + ndim])
+        dtype = bytes(shm.buf[_DTYPE_OFFSET:_DTYPE_OFFSET + _DTYPE_SIZE]).rstrip(b'\0').decode()
+        self.dtype = np.dtype(dtype)
+
+        metadata_len = int(self.header[_METADATA_LEN])
+        self.metadata = json.loads(bytes(shm.buf[HEADER_SIZE:HEADER_SIZE + metadata_len]).decode()) if metadata_len else {}
+
+        slots_offset = HEADER_SIZE + METADATA_SIZE
+        self.sequences = np.ndarray(self.n_slots, dtype=np.uint64, buffer=shm.buf,
+                                    offset=slots_offset, strides=(self.stride,))
+        self.timestamps = np.ndarray(self.n_slots, dtype=np.float64, buffer=shm.buf,
+                                     offset=slots_offset + 8, strides=(self.stride,))
+        self.payloads = [
+            np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf,
+                       offset=slots_offset + i * self.stride + SLOT_HEADER_SIZE)
+            for i in range(self.n_slots)
+        ]
+
+    @property
+    def write_count(self):
+        return int(self.header[_WRITE_COUNT])
+
+    def release(self):
+        """Drop the views so that the shared memory can be closed."""
+        self.header = self.sequences = self.timestamps = None
+        self.payloads = []
+
+
+class RingWriter:
+    """Single producer side of a ring buffer."""
+
+    def __init__(self, name, shape, dtype, n_slots, metadata=None):
+        """
+        Create (or replace a stale) segment.
+        Args:
+            name (str): Shared memory segment name
+            shape (tuple): Shape of every message payload
+            dtype: NumPy dtype of the payload
+            n_slots (int): Number of messages kept in the ring
+            metadata (dict): JSON serialisable description stored in the segment
+        """
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        if len(shape) > MAX_DIMS:
+            raise ValueError(f"Payload can have at most {MAX_DIMS} dimensions")
+        metadata_bytes = json.dumps(metadata if metadata else {}).encode()
+        if len(metadata_bytes) > METADATA_SIZE:
+            raise ValueError("Ring buffer metadata is too large")
+
+        payload_size = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        stride = (SLOT_HEADER_SIZE + payload_size + 63) & ~63  # cache line alignment
+        size = HEADER_SIZE + METADATA_SIZE + n_slots * stride
+
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Segmento rimasto da un'esecuzione precedente terminata in modo anomalo
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        header = np.ndarray(_METADATA_LEN + 1, dtype=np.uint64, buffer=shm.buf, offset=0)
+        header[:] = 0
+        header[_VERSION] = VERSION
+        header[_SLOTS] = n_slots
+        header[_STRIDE] = stride
+        header[_PAYLOAD] = payload_size
+        header[_NDIM] = len(shape)
+        header[_SHAPE:_SHAPE + len(shape)] = shape
+        header[_METADATA_LEN] = len(metadata_bytes)
+        dtype_str = dtype.str.encode()
+        shm.buf[_DTYPE_OFFSET:_DTYPE_OFFSET + len(dtype_str)] = dtype_str
+        shm.buf[HEADER_SIZE:HEADER_SIZE + len(metadata_bytes)] = metadata_bytes
+        header[_MAGIC] = MAGIC  # scritto per ultimo: il segmento è pronto
+        del header
+
+        _owned_segments.add(name)
+        self.segment = _Segment(shm)
+
+    @property
+    def name(self):
+        return self.segment.shm.name
+
+    def write(self, array, timestamp):
+        """
+        Publish a message.
+        Args:
+            array (np.ndarray): Payload with the shape given at creation
+            timestamp (float): Time of the message
+        """
+        segment = self.segment
+        array = np.asarray(array)
+        if array.shape != segment.shape:
+            raise ValueError(f"Expected payload of shape {segment.shape}, got {array.shape}")
+
+        k = segment.write_count
+        slot = k % segment.n_slots
+        segment.sequences[slot] = 2 * k + 1  # scrittura in corso
+        segment.payloads[slot][...] = array
+        segment.timestamps[slot] = timestamp
+        segment.sequences[slot] = 2 * k + 2  # scrittura completata
+        segment.header[_WRITE_COUNT] = k + 1
+
+    def close(self):
+        """Destroy the segment."""
+        shm = self.segment.shm
+        self.segment.release()
+        shm.close()
+        shm.unlink()
+        _owned_segments.discard(shm.name)
+
+
+class Sample:
+    """
+    A message read from a ring buffer.
+    Attributes:
+        sequence (int): Message number (0 for the first published message)
+        timestamp (float): Time of the message
+        data (np.ndarray): Payload, either a copy or a zero-copy view of the slot
+    """
+
+    def __init__(self, sequence, timestamp, data):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.data = data
+
+
+class RingReader:
+    """
+    Reader library for the same-host transport.
+    Example:
+        reader = RingReader.for_topic('/deformation_updates_liver')
+        sample = reader.read_latest()
+        if sample is not None:
+            render(sample.data)
+    """
+
+    def __init__(self, name):
+        self.segment = _Segment(_attach(name))
+        self.next_sequence = 0
+        self.dropped = 0
+
+    @staticmethod
+    def for_topic(topic_name, prefix='sofasurgsim'):
+        """Attach to the segment of a topic published by SharedMemoryClient."""
+        return RingReader(segment_name(topic_name, prefix))
+
+    @property
+    def metadata(self):
+        return self.segment.metadata
+
+    def _read(self, k, copy):
+        """Read message k, or None if it was overwritten or is being written."""
+        segment = self.segment
+        slot = k % segment.n_slots
+        expected = 2 * k + 2
+        if int(segment.sequences[slot]) != expected:
+            return None
+        data = segment.payloads[slot].copy() if copy else segment.payloads[slot]
+        timestamp = float(segment.timestamps[slot])
+        if int(segment.sequences[slot]) != expected:
+            return None
+        return Sample(k, timestamp, data)
+
+    def read_latest(self, copy=True, retries=3):
+        """
+        Read the most recent message.
+        Args:
+            copy (bool): If False, data is a zero-copy view of the slot: call is_valid(sample)
+                         after using it to check that the writer did not overwrite it meanwhile
+            retries (int): Attempts when the writer is overwriting the latest slot
+        Returns:
+            Sample or None if nothing has been published yet
+        """
+        for _ in range(retries + 1):
+            count = self.segment.write_count
+            if count == 0:
+                return None
+            sample = self._read(count - 1, copy)
+            if sample is not None:
+                self.next_sequence = sample.sequence + 1
+                return sample
+        return None
+
+    def read_next(self, copy=True):
+        """
+        Read the oldest message not yet returned by this reader.
+        If the writer lapped the reader, the lost messages are counted in `dropped`.
+        Returns:
+            Sample or None if there is no new message
+        """
+        count = self.segment.write_count
+        oldest = max(count - self.segment.n_slots + 1, 0)  # lo slot più vecchio può essere in scrittura
+        if self.next_sequence < oldest:
+            self.dropped += oldest - self.next_sequence
+            self.next_sequence = oldest
+        while self.next_sequence < count:
+            sample = self._read(self.next_sequence, copy)
+            self.next_sequence += 1
+            if sample is not None:
+                return sample
+            self.dropped += 1
+        return None
+
+    def is_valid(self, sample):
+        """True if the slot of a zero-copy sample still holds that message."""
+        slot = sample.sequence % self.segment.n_slots
+        return int(self.segment.sequences[slot]) == 2 * sample.sequence + 2
+
+    def close(self):
+        """Detach from the segment (the writer owns and destroys it)."""
+        shm = self.segment.shm
+        self.segment.release()
+        shm.close()
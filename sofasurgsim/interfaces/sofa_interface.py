@@ -1,28 +1,52 @@
 #!/usr/bin/env python
 import Sofa
-import Sofa.Gui
 import math
+from typing import TYPE_CHECKING
 from config.base_config import config as cfg
 from sofasurgsim.managers.organ_manager import OrganManager
 from sofasurgsim.managers.robot_manager import RobotManager
-from sofasurgsim.interfaces.ros_interface import ROSClient
+from sofasurgsim.managers.solver_manager import SolverManager
+from sofasurgsim.managers.tracing_manager import TracingManager
+from sofasurgsim.solvers.solver_strategy import SolverStrategy
 from sofasurgsim.msg.Organ import Organ
 from sofasurgsim.msg.Robot import Robot
+from sofasurgsim.utils.tracing import tracer
+from sofasurgsim.utils.startup import startup_report
+from sofasurgsim.utils.mesh_reordering import reorder_tetrahedral_mesh
+from sofasurgsim.utils.spatial_index import UniformGridIndex
+
+if TYPE_CHECKING:
+    # Solo per le annotazioni: ros_interface non viene importato a runtime
+    from sofasurgsim.interfaces.ros_interface import ROSClient
+
+
+def _sofa_list(array):
+    """Formats an array as the space separated list expected by SOFA data fields."""
+    return " ".join(map(str, array.ravel().tolist()))
+
     
 class SOFASceneController:
-    def __init__(self, ros_client: ROSClient):
-        
+    def __init__(self, ros_client: 'ROSClient', config=None, shm_client=None):
+
+        self.config = config if config else cfg
+        tracer.configure(self.config)
         self.root_node = Sofa.Core.Node("root")
         self.root_node.addObject('DefaultAnimationLoop')
         self.root_node.addObject('DefaultVisualManagerLoop')
         
-        self.GUI = cfg.GUI
+        self.GUI = self.config.GUI
         self.ros_client = ros_client
-        self.root_node.dt.value = cfg.SIMULATION_STEP 
+        self.shm_client = shm_client
+        self.solver_strategy = SolverStrategy(self.config)
+        self.solver_manager = None
+        self.permutations = {}  # organ id -> MeshPermutation tra numerazione originale e SOFA
+        self.link_nodes = {}  # robot name -> {link name: nodo SOFA}
+        self.root_node.dt.value = self.config.SIMULATION_STEP 
 
-    def _create_scene(self):
+    def _create_scene(self, organ: Organ = None, robot: Robot = None):
         """
         Crea gli oggetti nella scena di SOFA utilizzando i dati iniziali ricevuti dai topic ROS.
+        Se organ e robot sono già disponibili (es. batch runner) i servizi ROS non vengono chiamati.
         """
         self.root_node.addChild('Root', gravity="0 -9.81 0", dt="0.02")
 
@@ -33,6 +57,8 @@ class SOFASceneController:
         'Sofa.Component.Constraint.Projective',
         'Sofa.Component.IO.Mesh',
         'Sofa.Component.LinearSolver.Iterative',
+        'Sofa.Component.LinearSolver.Direct',
+        'Sofa.Component.LinearSolver.Preconditioner',
         'Sofa.Component.Mapping.Linear',
         'Sofa.Component.Mass',
         'Sofa.Component.ODESolver.Backward',
@@ -55,33 +81,57 @@ class SOFASceneController:
 
 
 
-        organ_msg = self.ros_client.use_service(cfg.ORGANS_SERVICE, cfg.ORGANS_SERVICE_TYPE, 'organ')
-        organ = Organ.from_dict(organ_msg)
-        organ_node = self.create_sofa_nodes_from_meshes(organ.id, organ.surface, organ.tetrahedral_mesh)
+        if organ is None:
+            with startup_report.phase('fetch'):
+                organ_msg = self.ros_client.use_service(self.config.ORGANS_SERVICE, self.config.ORGANS_SERVICE_TYPE, 'organ')
+            with startup_report.phase('parse'):
+                organ = Organ.from_dict(organ_msg)
+        with tracer.span('scene.build_organ'):
+            organ_node = self.create_sofa_nodes_from_meshes(organ.id, organ.surface, organ.tetrahedral_mesh)
 
-        robot_msg = self.ros_client.use_service(cfg.ROBOT_SERVICE, cfg.ROBOT_SERVICE_TYPE, 'robot') 
-        
-        robot = Robot.from_dict(robot_msg)
-        robot_node = self.create_robot_node(robot)
+        if robot is None:
+            with startup_report.phase('fetch'):
+                robot_msg = self.ros_client.use_service(self.config.ROBOT_SERVICE, self.config.ROBOT_SERVICE_TYPE, 'robot') 
+            with startup_report.phase('parse'):
+                robot = Robot.from_dict(robot_msg)
+        with tracer.span('scene.build_robot'):
+            robot_node = self.create_robot_node(robot)
         
         # Enable collision between robot and organ
         robot_node.addObject('CollisionPipeline', name="robot_collision_group")
         organ_node.addObject('CollisionPipeline', name="organ_collision_group")
         
-        self.root_node.addObject(OrganManager(root_node=self.root_node, created_organs_node=[organ_node], ros_client=self.ros_client))
-        self.root_node.addObject(RobotManager(root_node=self.root_node, robot_node=robot_node, ros_client=self.ros_client))
+        robot_manager = RobotManager(root_node=self.root_node, robot_node=robot_node, link_nodes=self.link_nodes.get(robot.name), ros_client=self.ros_client, shm_client=self.shm_client, config=self.config)
+
+        self.root_node.addObject(TracingManager(first=True))
+        self.root_node.addObject(OrganManager(root_node=self.root_node, created_organs_node=[organ_node], ros_client=self.ros_client, shm_client=self.shm_client,
+                                              tool_positions=robot_manager.get_link_positions, config=self.config))
+        self.root_node.addObject(robot_manager)
+        self.solver_manager = self.root_node.addObject(SolverManager(root_node=self.root_node, organ_nodes=[organ_node], config=self.config))
+        self.root_node.addObject(TracingManager(first=False))
 
         return self.root_node
 
-    def run_simulation(self):
-        cfg.logger.info("Starting SOFA simulation.")
-        self._create_scene()
-        Sofa.Simulation.init(self.root_node)
+    def run_simulation(self, n_steps=None):
+        """
+        Build the scene and run the simulation.
+        Args:
+            n_steps (int): Number of steps to run without GUI (None runs forever)
+        """
+        self.config.logger.info("Starting SOFA simulation.")
+        with startup_report.phase('scene_build'):
+            self._create_scene()
+        with startup_report.phase('sofa_init'):
+            Sofa.Simulation.init(self.root_node)
         
         if not self.GUI:
-            while True:
+            step = 0
+            while n_steps is None or step < n_steps:
                 Sofa.Simulation.animate(self.root_node, self.root_node.dt.value)
+                step += 1
         else:
+            # Sofa.Gui viene caricato solo quando la GUI è abilitata
+            import Sofa.Gui
             Sofa.Gui.GUIManager.Init("main", "qglviewer")
             Sofa.Gui.GUIManager.createGUI(self.root_node)
             Sofa.Gui.GUIManager.MainLoop(self.root_node)
@@ -91,37 +141,56 @@ class SOFASceneController:
         """
         Create SOFA nodes from surface and tetrahedral mesh data.
 
-        :param surface_mesh: The surface mesh (Mesh) to use for the surface.
-        :param tetrahedral_mesh: The tetrahedral mesh (TetrahedralMesh) to use for the simulation.
+        :param surface_mesh: The surface mesh (Mesh, or any object with to_arrays() such as ArrayMesh).
+        :param tetrahedral_mesh: The tetrahedral mesh (TetrahedralMesh or ArrayMesh) to use for the simulation.
         :return: The created node with all related SOFA objects.
         """
+        # Le mesh arrivano come array (vertici, elementi): i messaggi li convertono una volta,
+        # i worker batch passano direttamente le viste sulla memoria condivisa
+        tetra_vertices, tetrahedra = tetrahedral_mesh.to_arrays()
+        surface_vertices, triangles = surface_mesh.to_arrays()
+
+        # Riordina vertici e tetraedri per la località in memoria; gli indici esterni
+        # (es. FIXED_INDICES) restano nella numerazione originale e vengono convertiti qui.
+        # Le mesh già riordinate (es. dal BatchRunner, una volta per tutti i job) portano la loro permutazione
+        permutation = getattr(tetrahedral_mesh, 'permutation', None)
+        report = None
+        if permutation is None:
+            tetra_vertices, tetrahedra, permutation, report = reorder_tetrahedral_mesh(
+                tetra_vertices, tetrahedra, self.config.MESH_REORDERING)
+        self.permutations[id] = permutation
+        if report is not None:
+            self.config.logger.info(f"Mesh {id} reordered with {report['method']}: bandwidth "
+                                    f"{report['bandwidth_before']} -> {report['bandwidth_after']}")
+
         organ_node = self.root_node.addChild(id)
 
-        # Add solver and linear solver for the simulation
-        organ_node.addObject('EulerImplicitSolver', name="cg_odesolver", rayleighStiffness="0.1", rayleighMass="0.1")
-        organ_node.addObject('CGLinearSolver', name="linear_solver", iterations="25", tolerance="1e-09", threshold="1e-09")
+        # Add solver and linear solver for the simulation, chosen from the configuration and the mesh size
+        strategy = self.solver_strategy.add_to_node(organ_node, len(tetra_vertices))
 
         # Create tetrahedral topology from data directly (without file)
-        organ_node.addObject('TetrahedronSetTopologyContainer', name="topo", 
-                tetrahedra=" ".join(" ".join(map(str, tetra.vertices_indices)) for tetra in tetrahedral_mesh.tetrahedra))
+        organ_node.addObject('TetrahedronSetTopologyContainer', name="topo", tetrahedra=_sofa_list(tetrahedra))
 
-        organ_node.addObject('MechanicalObject', name="dofs", 
-                position=" ".join(f"{v.x} {v.y} {v.z}" for v in tetrahedral_mesh.vertices))
+        organ_node.addObject('MechanicalObject', name="dofs", position=_sofa_list(tetra_vertices))
 
         organ_node.addObject('TetrahedronSetGeometryAlgorithms', template="Vec3d", name="GeomAlgo")
         organ_node.addObject('DiagonalMass', name="Mass", massDensity="1.0")
-        organ_node.addObject('TetrahedralCorotationalFEMForceField', template="Vec3d", name="FEM", method="large", poissonRatio="0.3", youngModulus="3000", computeGlobalMatrix="0")
-        organ_node.addObject('FixedConstraint', name="FixedConstraint", indices="3 39 64")
+        organ_node.addObject('TetrahedralCorotationalFEMForceField', template="Vec3d", name="FEM", method=self.solver_strategy.fem_method(strategy), poissonRatio=str(self.config.POISSON_RATIO), youngModulus=str(self.config.YOUNG_MODULUS), computeGlobalMatrix="0")
+        if self.config.FIXED_BOX is not None:
+            fixed_indices = UniformGridIndex(tetra_vertices).box_query(*self.config.FIXED_BOX)
+            if len(fixed_indices) == 0:
+                self.config.logger.warning(f"No vertex of {id} inside FIXED_BOX {self.config.FIXED_BOX}")
+        else:
+            fixed_indices = permutation.to_reordered(self.config.FIXED_INDICES)
+        organ_node.addObject('FixedConstraint', name="FixedConstraint", indices=" ".join(map(str, fixed_indices)))
 
         # organ_node.addObject('MouseInteractor', name="MouseInteractor", template="Vec3d", button=0)
 
         visu = organ_node.addChild('Visual')
 
-        visu.addObject('TriangleSetTopologyContainer', name="surface_topo",
-                    triangles=" ".join(" ".join(map(str, tri.vertex_indices)) for tri in surface_mesh.triangles))
+        visu.addObject('TriangleSetTopologyContainer', name="surface_topo", triangles=_sofa_list(triangles))
 
-        visu.addObject('MechanicalObject', name="visual_dofs", 
-                    position=" ".join(f"{v.x} {v.y} {v.z}" for v in surface_mesh.vertices))
+        visu.addObject('MechanicalObject', name="visual_dofs", position=_sofa_list(surface_vertices))
 
         visu.addObject('OglModel', name="VisualModel", src="@surface_topo", color="1 0 0 1")
         visu.addObject('BarycentricMapping', name="VisualMapping", input="@../dofs", output="@visual_dofs")  
@@ -134,6 +203,7 @@ class SOFASceneController:
         
         # Dizionario per tenere traccia dei nodi link per nome
         link_nodes = {}
+        self.link_nodes[robot_msg.name] = link_nodes
         
         # Dizionario per memorizzare la mappa parent-child dei link
         link_parent_map = {}
@@ -177,16 +247,15 @@ class SOFASceneController:
             
             # Aggiungi nodo collision
             if hasattr(link_data, 'collision_mesh') and link_data.collision_mesh:
+                collision_vertices, collision_triangles = link_data.collision_mesh.to_arrays()
                 collision_node = link_node.addChild("Collision")
                 collision_node.addObject('TriangleSetTopologyContainer',
                                     name="collision_topo",
-                                    triangles=" ".join(" ".join(map(str, tri.vertex_indices))
-                                                        for tri in link_data.collision_mesh.triangles))
+                                    triangles=_sofa_list(collision_triangles))
                 
                 collision_node.addObject('MechanicalObject',
                                     name="collision_dofs",
-                                    position=" ".join(f"{v.x} {v.y} {v.z}"
-                                                    for v in link_data.collision_mesh.vertices))
+                                    position=_sofa_list(collision_vertices))
                 
                 collision_node.addObject('TriangleCollisionModel',
                                     name="CollisionModel",
@@ -1,26 +1,55 @@
 import Sofa.Core
 import numpy as np
 import time
+import threading
+from typing import TYPE_CHECKING
 
-from sofasurgsim.msg.Organ import DeformationUpdate, Displacement
-from sofasurgsim.interfaces.ros_interface import ROSClient
+from sofasurgsim.msg.Organ import DeformationUpdate, DeformationKeyframe, Displacement
+from sofasurgsim.msg.codecs import decode_array, encode_array
+from sofasurgsim.utils.spatial_index import UniformGridIndex
+from sofasurgsim.utils.tracing import tracer
 from config.base_config import config as cfg
 
+if TYPE_CHECKING:
+    from sofasurgsim.interfaces.ros_interface import ROSClient
+
 class OrganManager(Sofa.Core.Controller):
-    def __init__(self, *args, root_node, created_organs_node, ros_client: ROSClient, **kwargs):
+    def __init__(self, *args, root_node, created_organs_node, ros_client: 'ROSClient', shm_client=None, tool_positions=None, config=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.config = config if config else cfg
         self.root_node = root_node
         self.ros_client = ros_client
+        self.shm_client = shm_client
         self.sofa_nodes = created_organs_node
+        # Stato dei subscriber: posizioni dopo l'ultimo messaggio inviato, aggiornate solo
+        # con ciò che è stato effettivamente pubblicato
         self.reference_positions = self._get_initial_positions()
-        self.deformation_threshold = cfg.DEFORMATION_THRESHOLD  
+        self.rest_positions = {name: positions.copy() for name, positions in self.reference_positions.items()}
+        self.deformation_threshold = self.config.DEFORMATION_THRESHOLD  
+
+        # Indici spaziali sulle posizioni correnti, per le query di prossimità con il robot;
+        # costruiti alla prima query, così senza ROI né query non costano nulla
+        self.tool_positions = tool_positions  # callable -> (n, 3) posizioni dei link del robot
+        self.spatial_indices = {}
+        self._stale_indices = {}  # organ -> posizioni correnti non ancora inserite nell'indice
+
+        # Stream keyframe + delta: numero di sequenza per organo e catena di delta corrente
+        self.sequences = {name: -1 for name in self.reference_positions}
+        self.keyframe_sequences = {name: None for name in self.reference_positions}
+        self.last_keyframe_times = {name: 0.0 for name in self.reference_positions}
+        self.state_lock = threading.Lock()  # il servizio di stato risponde da un altro thread
+        self.step = 0
+
+        if self.ros_client is not None and self.config.DEFORMATION_KEYFRAMES:
+            self.ros_client.advertise_service(self.config.ORGAN_STATE_SERVICE, self.config.ORGAN_STATE_SERVICE_TYPE,
+                                              self._handle_state_request)
 
     def _get_mechanical_object(self, node):
         """Retrieve the mechanical object from a SOFA node"""
         visu_node = node.getChild('Visual')
         mech_obj = visu_node.getObject('visual_dofs')
         if not mech_obj:
-            cfg.logger.error(f"Missing 'dofs' MechanicalObject in node {node.name.value}")
+            self.config.logger.error(f"Missing 'dofs' MechanicalObject in node {node.name.value}")
         return mech_obj
     
     def _get_initial_positions(self):
@@ -30,62 +59,195 @@ class OrganManager(Sofa.Core.Controller):
             for node in self.sofa_nodes if self._get_mechanical_object(node)
         }
 
-    def _compute_displacements(self, current_positions):
-        """Calculate displacements using vectorized operations"""
+    def _compute_displacements(self, current_positions, full_pass=False):
+        """
+        Calculate displacements using vectorized operations.
+        With ROI_RADIUS only the vertices near the robot are checked, except in a full pass.
+        """
         displacements = {}
         for name, current in current_positions.items():
             reference = self.reference_positions.get(name)
             if reference is None or len(reference) != len(current):
-                cfg.logger.warning(f"Skipping invalid position data for {name}")
+                self.config.logger.warning(f"Skipping invalid position data for {name}")
                 continue
                 
-            disp_vectors = current - reference
-            magnitude = np.linalg.norm(disp_vectors, axis=1)
-            indices = np.where(magnitude > self.deformation_threshold)[0].tolist()
-            filtered_disp_vectors = disp_vectors[indices]
+            roi = None if full_pass else self._roi_vertices(name)
+            if roi is None:
+                disp_vectors = current - reference
+                magnitude = np.linalg.norm(disp_vectors, axis=1)
+                indices = np.where(magnitude > self.deformation_threshold)[0].tolist()
+                filtered_disp_vectors = disp_vectors[indices]
+            else:
+                disp_vectors = current[roi] - reference[roi]
+                moved = np.linalg.norm(disp_vectors, axis=1) > self.deformation_threshold
+                indices = roi[moved].tolist()
+                filtered_disp_vectors = disp_vectors[moved]
             
             if indices:
                 displacements[name] = (indices, filtered_disp_vectors)
         
         return displacements
 
+    def _roi_vertices(self, name):
+        """Vertices within ROI_RADIUS of a robot link, or None to process the whole organ"""
+        if self.config.ROI_RADIUS is None or self.tool_positions is None:
+            return None
+        return self._spatial_index(name).query_points(self.tool_positions(), self.config.ROI_RADIUS)
+
+    def _spatial_index(self, name):
+        """Spatial index of an organ, built on first query and refitted on the positions of the last step only when queried"""
+        positions = self._stale_indices.pop(name, None)
+        index = self.spatial_indices.get(name)
+        if index is None:
+            if positions is None:
+                node = next(node for node in self.sofa_nodes if node.name.value == name)
+                positions = self._get_mechanical_object(node).position.array().copy()
+            with tracer.span('organ.index_build'):
+                index = self.spatial_indices[name] = UniformGridIndex(positions)
+        elif positions is not None:
+            with tracer.span('organ.index_update'):
+                index.update(positions)
+        return index
+
+    def vertices_near(self, name, point, radius):
+        """Ids of the vertices of an organ within radius of a point, in their current positions"""
+        return self._spatial_index(name).radius_query(point, radius)
+
+    def nearest_vertex(self, name, point):
+        """Id and distance of the vertex of an organ closest to a point"""
+        ids, distances = self._spatial_index(name).nearest(point, k=1)
+        return int(ids[0]), float(distances[0])
+
     def _create_deformation_updates(self, displacements):
-        """Generate ROS-compatible deformation updates"""
+        """Generate ROS-compatible deformation updates and advance the subscriber state"""
         updates = []
         for name, (indices, vectors) in displacements.items():
             displacements = [
                 Displacement(dx=vec[0], dy=vec[1], dz=vec[2]) 
                 for vec in vectors
             ]
+            self.sequences[name] += 1
             updates.append(DeformationUpdate(
                 timestamp=time.time(),
                 node_name=name,
                 vertex_ids=indices,
-                displacements=displacements
+                displacements=displacements,
+                sequence=self.sequences[name],
+                keyframe_sequence=self.keyframe_sequences[name]
             ))
+            # Solo i vertici pubblicati cambiano per i subscriber: gli altri restano
+            # al riferimento, così gli spostamenti sotto soglia si accumulano invece di perdersi
+            self.reference_positions[name][indices] += vectors
         return updates
 
+    def _keyframe_due(self, name):
+        """A keyframe is sent first, then every KEYFRAME_INTERVAL deltas or KEYFRAME_PERIOD seconds"""
+        keyframe_sequence = self.keyframe_sequences[name]
+        if keyframe_sequence is None:
+            return True
+        return (self.sequences[name] - keyframe_sequence >= self.config.KEYFRAME_INTERVAL or
+                time.time() - self.last_keyframe_times[name] >= self.config.KEYFRAME_PERIOD)
+
+    def _create_keyframe(self, name, current):
+        """Generate a keyframe with the current positions and restart the delta chain"""
+        self.sequences[name] += 1
+        timestamp = time.time()
+        encoded = encode_array(current, self.config.KEYFRAME_DTYPE)
+        # Il riferimento è ciò che i subscriber decodificano, precisione del formato inclusa
+        self.reference_positions[name] = decode_array(encoded).astype(np.float64)
+        self.keyframe_sequences[name] = self.sequences[name]
+        self.last_keyframe_times[name] = timestamp
+        return DeformationKeyframe(node_name=name, sequence=self.sequences[name],
+                                   positions=self.reference_positions[name], timestamp=timestamp)
+
+    def _handle_state_request(self, request, response):
+        """
+        Service returning a keyframe of the current subscriber state of an organ.
+        Deltas with a sequence greater than the returned one apply on top of it.
+        """
+        name = request.get('node_name') or next(iter(self.reference_positions), None)
+        with self.state_lock:
+            if name not in self.reference_positions:
+                self.config.logger.error(f"State requested for unknown organ {name}")
+                return False
+            keyframe = DeformationKeyframe(node_name=name, sequence=self.sequences[name],
+                                           positions=self.reference_positions[name].copy(), timestamp=time.time())
+        response['keyframe'] = keyframe.to_dict(self.config.KEYFRAME_DTYPE)
+        return True
+
     def _publish_updates(self, updates):
         """Batch publish deformation updates"""
         for update in updates:
-            self.ros_client.create_publisher(
-                f"/deformation_updates_{update.node_name}",
-                'sofa_surgical_msgs/DeformationUpdate',
-                update.to_dict()
+            if isinstance(update, DeformationKeyframe):
+                self.ros_client.create_publisher(
+                    f"{self.config.KEYFRAME_TOPIC_PREFIX}{update.node_name}",
+                    self.config.KEYFRAME_TOPIC_TYPE,
+                    update.to_dict(self.config.KEYFRAME_DTYPE)
+                )
+            else:
+                self.ros_client.create_publisher(
+                    f"{self.config.DEFORMATION_TOPIC_PREFIX}{update.node_name}",
+                    self.config.DEFORMATION_TOPIC_TYPE,
+                    update.to_dict(with_sequence=self.config.DEFORMATION_KEYFRAMES)
+                )
+
+    def _publish_shared_memory(self, current_positions):
+        """Publish the displacements of all vertices from the rest positions, at every step"""
+        timestamp = time.time()
+        for name, current in current_positions.items():
+            rest = self.rest_positions.get(name)
+            if rest is None or len(rest) != len(current):
+                continue
+            self.shm_client.create_publisher(
+                f"{self.config.DEFORMATION_TOPIC_PREFIX}{name}",
+                self.config.SHM_DEFORMATION_TYPE,
+                current - rest,
+                timestamp=timestamp
             )
 
     def onAnimateEndEvent(self, event):
         """Main processing at end of simulation step"""
+        with tracer.span('organ.end'):
+            self._process_step()
+
+    def _process_step(self):
+        """Compute, and publish if significant, the deformations of the last step"""
         current_positions = {
             node.name.value: self._get_mechanical_object(node).position.array().copy()
             for node in self.sofa_nodes if self._get_mechanical_object(node)
         }
         
-        displacements = self._compute_displacements(current_positions)
-        if displacements:
-            updates = self._create_deformation_updates(displacements)
-            self._publish_updates(updates)
-            self.reference_positions = current_positions  # Update reference
+        if self.shm_client is not None:
+            self._publish_shared_memory(current_positions)
+
+        if self.spatial_indices:
+            self._stale_indices = current_positions
+
+        # Senza client ROS (es. worker batch) nessuno riceve keyframe o delta
+        if self.ros_client is None:
+            return
+
+        # Con la ROI le deformazioni lontane dal robot si accumulano nel riferimento: un passaggio
+        # periodico su tutto l'organo le invia anche senza keyframe (DEFORMATION_KEYFRAMES)
+        self.step += 1
+        full_pass = (self.config.ROI_RADIUS is not None and
+                     self.step % max(int(self.config.ROI_FULL_PASS_INTERVAL), 1) == 0)
+
+        with self.state_lock:
+            updates = [
+                self._create_keyframe(name, current)
+                for name, current in current_positions.items()
+                if self.config.DEFORMATION_KEYFRAMES and self._keyframe_due(name)
+            ]
+            keyframed = {update.node_name for update in updates}
+            displacements = self._compute_displacements(
+                {name: current for name, current in current_positions.items() if name not in keyframed}, full_pass)
+            updates += self._create_deformation_updates(displacements)
+
+        if updates:
+            with tracer.span('organ.publish'):
+                self._publish_updates(updates)
 
         else:
-            cfg.logger.info("No significant deformations detected")
+            # Contato e riportato nelle metriche periodiche invece di un log per ogni passo
+            tracer.count('idle_steps')
@@ -1,13 +1,21 @@
 import Sofa.Core
+import numpy as np
+from typing import TYPE_CHECKING
 
-from sofasurgsim.interfaces.ros_interface import ROSClient
+from sofasurgsim.utils.tracing import tracer
 from config.base_config import config as cfg
 
+if TYPE_CHECKING:
+    from sofasurgsim.interfaces.ros_interface import ROSClient
+
 class RobotManager(Sofa.Core.Controller):
-    def __init__(self, *args, ros_client: ROSClient, robot_node, **kwargs):
+    def __init__(self, *args, ros_client: 'ROSClient', robot_node, link_nodes=None, shm_client=None, config=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.config = config if config else cfg
         self.ros_client = ros_client
+        self.shm_client = shm_client
         self.robot_node = robot_node
+        self.link_nodes = link_nodes if link_nodes else {}  # link name -> SOFA node with a Rigid3d 'dof'
         self.latest_joint_command = None  # Store incoming ROS commands
 
         # # Subscribe to ROS joint targets
@@ -23,8 +31,30 @@ class RobotManager(Sofa.Core.Controller):
 
     def onAnimateBeginEvent(self, event):
         """Apply latest ROS command at start of simulation step"""
-        if self.latest_joint_command:
-            self._apply_joint_update(self.latest_joint_command)
+        with tracer.span('robot.begin'):
+            if self.latest_joint_command:
+                self._apply_joint_update(self.latest_joint_command)
+
+    def get_link_poses(self):
+        """Poses of the robot links as an (n_links, 7) array of [x y z qx qy qz qw]"""
+        return np.array([
+            node.getObject('dof').position.array()[0]
+            for node in self.link_nodes.values()
+        ]).reshape(-1, 7)
+
+    def get_link_positions(self):
+        """Positions of the robot links as an (n_links, 3) array"""
+        return self.get_link_poses()[:, :3]
+
+    def onAnimateEndEvent(self, event):
+        """Publish the link poses on the same-host transport at end of simulation step"""
+        if self.shm_client is not None and self.link_nodes:
+            self.shm_client.create_publisher(
+                f"{self.config.ROBOT_POSE_TOPIC_PREFIX}{self.robot_node.name.value}",
+                self.config.SHM_ROBOT_POSE_TYPE,
+                self.get_link_poses(),
+                labels=list(self.link_nodes)
+            )
 
     def _apply_joint_update(self, msg):
         """Update SOFA's joint positions to match ROS command"""
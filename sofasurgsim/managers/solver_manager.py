@@ -0,0 +1,118 @@
+import re
+import Sofa.Core
+import numpy as np
+from collections import deque
+
+from config.base_config import config as cfg
+
+
+def _graph_errors(value):
+    """
+    Residual history from the 'graph' data of an iterative solver, or None if it cannot be read.
+    Depending on the binding the map comes as a dict or in its string form (e.g. "{Error [1 0.5 ...]}").
+    """
+    # La chiave è 'Error', o '<nodo>-Error' quando il solutore gestisce più gruppi
+    if isinstance(value, dict):
+        return next((list(value[key]) for key in value if key.endswith('Error')), [])
+    if isinstance(value, str):
+        if not value.strip():
+            return []
+        match = re.search(r'Error\W*((?:[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?[\s,]*)+)', value)
+        if match is None:
+            return None
+        return [float(x) for x in re.split(r'[\s,]+', match.group(1).strip()) if x]
+    return None
+
+
+class SolverManager(Sofa.Core.Controller):
+    """
+    Collects per-step iteration counts and residuals of the organ linear solvers and,
+    when ADAPTIVE_TIME_STEP is enabled, adapts the time step of the root node:
+    the step shrinks when a solver does not converge and grows again when it converges easily.
+    """
+
+    def __init__(self, *args, root_node, organ_nodes, config=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config = config if config else cfg
+        self.root_node = root_node
+        self.solvers = {
+            node.name.value: node.getObject('linear_solver')
+            for node in organ_nodes if node.getObject('linear_solver')
+        }
+        self.step = 0
+        history = self.config.SOLVER_HISTORY
+        self.iterations = deque(maxlen=history)  # per passo: massimo numero di iterazioni tra gli organi
+        self.residuals = deque(maxlen=history)   # per passo: massimo residuo tra gli organi (nan se non disponibile)
+        self.time_steps = deque(maxlen=history)
+        self._graph_warned = False
+
+    def _solver_stats(self, solver):
+        """
+        Read the iteration count and final residual of the last solve.
+        Iterative solvers expose the residual history in their 'graph' data;
+        direct solvers always take a single iteration and report no residual.
+        """
+        graph = solver.findData('graph')
+        if graph is None:
+            return 1, float('nan')
+
+        errors = _graph_errors(graph.value)
+        if errors is None:
+            if not self._graph_warned:
+                self._graph_warned = True
+                self.config.logger.warning(
+                    f"Cannot read the residual history of {solver.name.value} ({type(graph.value).__name__}): "
+                    f"iterations are not reported and ADAPTIVE_TIME_STEP has no effect")
+            return 0, float('nan')
+        if len(errors) == 0:
+            return 0, float('nan')
+        # Il solutore inserisce il residuo iniziale (1) prima di iterare,
+        # poi un valore per ogni iterazione
+        return len(errors) - 1, float(errors[-1])
+
+    def _adapt_time_step(self, iterations, residual):
+        """Shrink or grow the time step depending on the convergence of the last solve."""
+        dt = self.root_node.dt.value
+        max_iterations = self.config.CG_ITERATIONS
+        # Decide il residuo finale (lo stesso valore che il CG confronta con la tolleranza):
+        # raggiungere il limite di iterazioni con un residuo entro la tolleranza è convergenza
+        converged = residual <= self.config.CG_TOLERANCE
+
+        if not converged:
+            dt = max(dt * self.config.TIME_STEP_DECREASE, self.config.MIN_SIMULATION_STEP)
+        elif iterations <= max_iterations // 4:
+            dt = min(dt * self.config.TIME_STEP_INCREASE, self.config.MAX_SIMULATION_STEP)
+
+        if dt != self.root_node.dt.value:
+            self.root_node.dt.value = dt
+
+    def _report(self):
+        """Log a summary of the last SOLVER_REPORT_EVERY steps."""
+        window = self.config.SOLVER_REPORT_EVERY
+        iterations = np.asarray(self.iterations)[-window:]
+        residuals = np.asarray(self.residuals)[-window:]
+        max_residual = np.nanmax(residuals) if not np.all(np.isnan(residuals)) else float('nan')
+        self.config.logger.info(
+            f"Solver step {self.step}: mean iterations {iterations.mean():.1f}, "
+            f"max iterations {iterations.max()}, max residual {max_residual:.3e}, dt {self.root_node.dt.value:.4g}")
+
+    def onAnimateEndEvent(self, event):
+        """Record solver statistics at end of simulation step"""
+        iterations, residual = 0, float('nan')
+        for solver in self.solvers.values():
+            solver_iterations, solver_residual = self._solver_stats(solver)
+            iterations = max(iterations, solver_iterations)
+            if not np.isnan(solver_residual):
+                residual = solver_residual if np.isnan(residual) else max(residual, solver_residual)
+
+        self.time_steps.append(self.root_node.dt.value)
+        self.iterations.append(iterations)
+        self.residuals.append(residual)
+        self.step += 1
+
+        # Senza residuo (solutori diretti) non c'è un criterio di convergenza da seguire
+        if self.config.ADAPTIVE_TIME_STEP and not np.isnan(residual):
+            self._adapt_time_step(iterations, residual)
+
+        if self.config.SOLVER_REPORT_EVERY and self.step % self.config.SOLVER_REPORT_EVERY == 0:
+            self._report()
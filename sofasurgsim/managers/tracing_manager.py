@@ -0,0 +1,37 @@
+import Sofa.Core
+
+from sofasurgsim.utils.tracing import tracer
+from sofasurgsim.utils.startup import startup_report
+from config.base_config import config as cfg
+
+class TracingManager(Sofa.Core.Controller):
+    """
+    Marks the boundaries of the simulation step for the tracer.
+    SOFA delivers animation events to the controllers of a node in the order they were added,
+    so one instance is added before the other managers (first=True) and one after them:
+        first.onAnimateBeginEvent  -> step start
+        last.onAnimateBeginEvent   -> solve start (after RobotManager)
+        first.onAnimateEndEvent    -> solve end (before OrganManager)
+        last.onAnimateEndEvent     -> step end
+    """
+
+    def __init__(self, *args, first, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first = first
+
+    def onAnimateBeginEvent(self, event):
+        if self.first:
+            if not startup_report.completed:
+                startup_report.begin_first_step()
+            tracer.begin('step')
+        else:
+            tracer.begin('sofa.solve')
+
+    def onAnimateEndEvent(self, event):
+        if self.first:
+            tracer.end('sofa.solve')
+        else:
+            tracer.end('step')
+            tracer.step_completed()
+            if not startup_report.completed:
+                startup_report.complete(cfg.logger)
@@ -1,5 +1,7 @@
 from typing import List, Optional
-import vtk
+import numpy as np
+
+from .codecs import encode_array, decode_array
 
 class Point:
     """Class representing a 3D point."""
@@ -87,6 +89,12 @@ class Mesh:
         vertices = [Point.from_dict(v) for v in data['vertices']]
         triangles = [MeshTriangle.from_dict(t) for t in data['triangles']]
         return Mesh(vertices=vertices, triangles=triangles)
+
+    def to_arrays(self):
+        """Converts the mesh into (vertices (n, 3), triangles (m, 3)) NumPy arrays."""
+        vertices = np.array([[v.x, v.y, v.z] for v in self.vertices], dtype=np.float64).reshape(-1, 3)
+        triangles = np.array([t.vertex_indices for t in self.triangles], dtype=np.int32).reshape(-1, 3)
+        return vertices, triangles
     
 class Tetrahedron:
     """Class representing a tetrahedron with 4 vertex indices."""
@@ -132,6 +140,12 @@ class TetrahedralMesh:
         tetrahedra = [Tetrahedron.from_dict(t) for t in data['tetrahedrons']]
         
         return TetrahedralMesh(vertices=vertices, tetrahedra=tetrahedra)
+
+    def to_arrays(self):
+        """Converts the mesh into (vertices (n, 3), tetrahedra (m, 4)) NumPy arrays."""
+        vertices = np.array([[v.x, v.y, v.z] for v in self.vertices], dtype=np.float64).reshape(-1, 3)
+        tetrahedra = np.array([t.vertices_indices for t in self.tetrahedra], dtype=np.int32).reshape(-1, 4)
+        return vertices, tetrahedra
     
 
 class Organ:
@@ -202,9 +216,12 @@ class DeformationUpdate:
         vertex_ids (list[int]): List of vertex IDs that have been deformed.
         displacements (list[Displacement]): List of displacements corresponding to the vertex IDs.
         timestamp (float): Time of generation of the deformation update.
+        sequence (int): Sequence number in the deformation stream of the node.
+        keyframe_sequence (int): Sequence number of the keyframe the delta chain starts from.
     """
 
-    def __init__(self, node_name: str, vertex_ids: list[int], displacements: list[Displacement], timestamp: float):
+    def __init__(self, node_name: str, vertex_ids: list[int], displacements: list[Displacement], timestamp: float,
+                 sequence: int = 0, keyframe_sequence: int = 0):
         """
         Initializes a DeformationUpdate object.
         Args:
@@ -212,20 +229,33 @@ class DeformationUpdate:
             vertex_ids (list[int]): List of vertex IDs that have been deformed.
             displacements (list[Displacement]): List of displacements for the vertices.
             timestamp (float): Time of generation of the deformation update.
+            sequence (int): Sequence number; the delta applies to the state at sequence - 1.
+            keyframe_sequence (int): Sequence number of the keyframe the delta chain starts from.
         """
         self.node_name = node_name
         self.vertex_ids = vertex_ids
         self.displacements = displacements
         self.timestamp = timestamp
+        self.sequence = sequence
+        self.keyframe_sequence = keyframe_sequence
 
-    def to_dict(self):
-        """Converts the DeformationUpdate object to a dictionary."""
-        return {
+    def to_dict(self, with_sequence=True):
+        """
+        Converts the DeformationUpdate object to a dictionary.
+        Args:
+            with_sequence (bool): Include sequence and keyframe_sequence; without them
+                                  the dictionary matches the original DeformationUpdate message
+        """
+        data = {
             'node_name': self.node_name,
             'vertex_ids': self.vertex_ids,
             'displacements': [disp.to_dict() for disp in self.displacements],
             'timestamp': self.timestamp
         }
+        if with_sequence:
+            data['sequence'] = self.sequence
+            data['keyframe_sequence'] = self.keyframe_sequence
+        return data
 
     @staticmethod
     def from_dict(data):
@@ -234,4 +264,45 @@ class DeformationUpdate:
         vertex_ids = data['vertex_ids']
         displacements = [Displacement.from_dict(d) for d in data['displacements']]
         timestamp = data['timestamp']
-        return DeformationUpdate(node_name=node_name, vertex_ids=vertex_ids, displacements=displacements, timestamp=timestamp)
\ No newline at end of file
+        return DeformationUpdate(node_name=node_name, vertex_ids=vertex_ids, displacements=displacements, timestamp=timestamp,
+                                 sequence=data.get('sequence', 0), keyframe_sequence=data.get('keyframe_sequence', 0))
+
+
+class DeformationKeyframe:
+    """
+    Represents the full state of a deformable mesh in the deformation stream.
+    Attributes:
+        node_name (str): Name of the node.
+        sequence (int): Sequence number in the deformation stream of the node.
+        positions (np.ndarray): (n_vertices, 3) positions of all the vertices.
+        timestamp (float): Time of generation of the keyframe.
+    """
+
+    def __init__(self, node_name: str, sequence: int, positions, timestamp: float):
+        """
+        Initializes a DeformationKeyframe object.
+        Args:
+            node_name (str): Name of the node.
+            sequence (int): Sequence number; later deltas build on this state.
+            positions (np.ndarray): (n_vertices, 3) positions of all the vertices.
+            timestamp (float): Time of generation of the keyframe.
+        """
+        self.node_name = node_name
+        self.sequence = sequence
+        self.positions = positions
+        self.timestamp = timestamp
+
+    def to_dict(self, dtype='<f4'):
+        """Converts the DeformationKeyframe object to a dictionary, positions in the binary format."""
+        return {
+            'node_name': self.node_name,
+            'sequence': self.sequence,
+            'positions': encode_array(self.positions, dtype),
+            'timestamp': self.timestamp
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Creates a DeformationKeyframe object from a dictionary."""
+        return DeformationKeyframe(node_name=data['node_name'], sequence=data['sequence'],
+                                   positions=decode_array(data['positions']), timestamp=data['timestamp'])
\ No newline at end of file
@@ -0,0 +1,27 @@
+import base64
+import numpy as np
+
+
+def encode_array(array, dtype='<f4'):
+    """
+    Encodes a NumPy array in the compact binary format used by the messages.
+    rosbridge transports binary (uint8[]) fields as base64 strings, so the
+    raw little-endian buffer is base64 encoded.
+    Args:
+        array (np.ndarray): Array to encode
+        dtype (str): Little-endian dtype of the encoded values (float32 by default)
+    Returns:
+        dict: {'dtype', 'shape', 'data'}
+    """
+    array = np.ascontiguousarray(array, dtype=np.dtype(dtype))
+    return {
+        'dtype': array.dtype.str,
+        'shape': list(array.shape),
+        'data': base64.b64encode(array.tobytes()).decode('ascii')
+    }
+
+
+def decode_array(data):
+    """Decodes an array encoded with encode_array."""
+    buffer = base64.b64decode(data['data'])
+    return np.frombuffer(buffer, dtype=np.dtype(data['dtype'])).reshape(data['shape'])
@@ -0,0 +1,74 @@
+import numpy as np
+
+from .Organ import DeformationUpdate, DeformationKeyframe
+
+
+class DeformationStream:
+    """
+    Subscriber side of the deformation stream of one node.
+    Keyframes set the full state, deltas are applied in sequence order on top of it.
+    Keyframes and deltas travel on different topics, so their arrival order is not
+    guaranteed: deltas that arrive before their keyframe or after a gap are buffered
+    and replayed as soon as the missing messages (or a newer keyframe, e.g. from the
+    organ state service) arrive. Stale deltas (already covered by the state) are ignored.
+    """
+
+    def __init__(self, node_name: str, max_pending: int = 1024):
+        """
+        Args:
+            node_name (str): Name of the node.
+            max_pending (int): Maximum number of buffered deltas waiting for a keyframe or a missing delta.
+        """
+        self.node_name = node_name
+        self.positions = None
+        self.sequence = None
+        self.needs_resync = True
+        self.max_pending = max_pending
+        self.pending = {}  # sequence -> DeformationUpdate in attesa
+
+    def apply_keyframe(self, keyframe: DeformationKeyframe):
+        """
+        Replace the state with a keyframe, then replay the buffered deltas that follow it.
+        Keyframes not newer than the current state are ignored.
+        """
+        if self.sequence is not None and keyframe.sequence <= self.sequence:
+            return False
+        self.positions = np.array(keyframe.positions, dtype=np.float64)
+        self.sequence = keyframe.sequence
+        self._replay_pending()
+        return True
+
+    def apply_update(self, update: DeformationUpdate):
+        """
+        Apply a delta, or buffer it if the state it builds on has not arrived yet.
+        Returns:
+            bool: True if the delta was applied; False if it was stale or buffered
+            (needs_resync tells whether the stream is still waiting for messages)
+        """
+        if self.sequence is not None and update.sequence <= self.sequence:
+            # Delta in ritardo o duplicato, già compreso nello stato (es. precede il keyframe)
+            return False
+        if self.sequence is None or update.sequence > self.sequence + 1:
+            if len(self.pending) < self.max_pending:
+                self.pending[update.sequence] = update
+            self.needs_resync = True
+            return False
+        self._apply_delta(update)
+        self._replay_pending()
+        return True
+
+    def _apply_delta(self, update):
+        """Add the displacements of a delta that directly follows the state."""
+        if update.vertex_ids:
+            vectors = np.array([[d.dx, d.dy, d.dz] for d in update.displacements], dtype=np.float64)
+            self.positions[np.asarray(update.vertex_ids)] += vectors
+        self.sequence = update.sequence
+
+    def _replay_pending(self):
+        """Apply the buffered deltas that now directly follow the state and drop the stale ones."""
+        while self.sequence + 1 in self.pending:
+            self._apply_delta(self.pending.pop(self.sequence + 1))
+        for sequence in [s for s in self.pending if s <= self.sequence]:
+            del self.pending[sequence]
+        # Restano solo delta oltre un buco: si attende il delta mancante o un keyframe
+        self.needs_resync = bool(self.pending)
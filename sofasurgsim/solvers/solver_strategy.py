@@ -0,0 +1,121 @@
+from config.base_config import config as cfg
+
+STRATEGIES = ('auto', 'cg', 'direct', 'precomputed')
+PRECONDITIONERS = (None, 'jacobi', 'ssor', 'ldl')
+DIRECT_SOLVERS = {
+    'ldl': ('SparseLDLSolver', 'CompressedRowSparseMatrixMat3x3d'),
+    'cholesky': ('SparseCholeskySolver', 'CompressedRowSparseMatrixd'),
+}
+
+
+class SolverStrategy:
+    """
+    Chooses and creates the linear solver of an organ node from the configuration
+    and the size of the tetrahedral mesh.
+    Strategies:
+        cg: iterative conjugate gradient, optionally preconditioned
+        direct: sparse LDL/Cholesky, with the factorisation reused for FACTORIZATION_UPDATE_STEPS steps
+        precomputed: compliance precomputed once, only for small linear (FEM_METHOD='small') organs
+        auto: precomputed, direct or cg depending on the number of vertices
+    """
+
+    def __init__(self, config=None):
+        self.config = config if config else cfg
+        if self.config.SOLVER_STRATEGY not in STRATEGIES:
+            raise ValueError(f"Unknown solver strategy: {self.config.SOLVER_STRATEGY}")
+        if self.config.CG_PRECONDITIONER not in PRECONDITIONERS:
+            raise ValueError(f"Unknown preconditioner: {self.config.CG_PRECONDITIONER}")
+        if self.config.DIRECT_SOLVER not in DIRECT_SOLVERS:
+            raise ValueError(f"Unknown direct solver: {self.config.DIRECT_SOLVER}")
+
+    def choose(self, n_vertices):
+        """
+        Select the strategy for a mesh.
+        Args:
+            n_vertices (int): Number of vertices of the tetrahedral mesh
+        Returns:
+            str: 'cg', 'direct' or 'precomputed'
+        """
+        strategy = self.config.SOLVER_STRATEGY
+        if strategy != 'auto':
+            return strategy
+
+        if self.config.FEM_METHOD == 'small' and n_vertices <= self.config.PRECOMPUTED_MAX_VERTICES:
+            return 'precomputed'
+        if n_vertices <= self.config.DIRECT_MAX_VERTICES:
+            return 'direct'
+        return 'cg'
+
+    def fem_method(self, strategy):
+        """Returns the FEM method compatible with the strategy."""
+        if strategy == 'precomputed' and self.config.FEM_METHOD != 'small':
+            self.config.logger.warning("Precomputed compliance requires linear elasticity, using FEM method 'small'")
+            return 'small'
+        return self.config.FEM_METHOD
+
+    def add_to_node(self, node, n_vertices):
+        """
+        Add the ODE and linear solvers to an organ node.
+        The linear solver used by the ODE solver is always named 'linear_solver'.
+        Args:
+            node: SOFA node of the organ
+            n_vertices (int): Number of vertices of the tetrahedral mesh
+        Returns:
+            str: The strategy that was applied
+        """
+        strategy = self.choose(n_vertices)
+
+        # Collegamento esplicito: altrimenti l'ODE solver usa il primo LinearSolver del nodo,
+        # che può essere un precondizionatore o la fattorizzazione invece di 'linear_solver'
+        node.addObject('EulerImplicitSolver', name="cg_odesolver", rayleighStiffness="0.1", rayleighMass="0.1",
+                       linearSolver="@linear_solver")
+
+        if strategy == 'cg':
+            self._add_iterative(node)
+        elif strategy == 'direct':
+            self._add_direct(node)
+        else:
+            node.addObject('PrecomputedLinearSolver', name="linear_solver")
+
+        self.config.logger.info(f"Solver strategy for {node.name.value} ({n_vertices} vertices): {strategy}")
+        return strategy
+
+    def _add_iterative(self, node):
+        """Conjugate gradient, preconditioned when CG_PRECONDITIONER is set."""
+        preconditioner = self.config.CG_PRECONDITIONER
+        if preconditioner is None:
+            node.addObject('CGLinearSolver', name="linear_solver", iterations=str(self.config.CG_ITERATIONS),
+                           tolerance=str(self.config.CG_TOLERANCE), threshold=str(self.config.CG_THRESHOLD))
+            return
+
+        # Il PCG precede il precondizionatore nel nodo: è il solutore usato dall'ODE solver
+        node.addObject('PCGLinearSolver', name="linear_solver", iterations=str(self.config.CG_ITERATIONS),
+                       tolerance=str(self.config.CG_TOLERANCE), preconditioner="@preconditioner",
+                       update_step=str(self.config.FACTORIZATION_UPDATE_STEPS))
+        if preconditioner == 'jacobi':
+            node.addObject('JacobiPreconditioner', name="preconditioner")
+        elif preconditioner == 'ssor':
+            node.addObject('SSORPreconditioner', name="preconditioner")
+        else:
+            self._add_warped_factorization(node, name="preconditioner")
+
+    def _add_direct(self, node):
+        """Sparse direct solver; the factorisation is reused between updates."""
+        if self.config.FACTORIZATION_UPDATE_STEPS <= 1:
+            solver, template = DIRECT_SOLVERS[self.config.DIRECT_SOLVER]
+            node.addObject(solver, name="linear_solver", template=template)
+            return
+
+        # La fattorizzazione viene ricalcolata ogni FACTORIZATION_UPDATE_STEPS passi e ruotata
+        # (warping) negli altri; poche iterazioni di PCG correggono l'errore residuo.
+        node.addObject('PCGLinearSolver', name="linear_solver", iterations=str(self.config.CG_ITERATIONS),
+                       tolerance=str(self.config.CG_TOLERANCE), preconditioner="@preconditioner",
+                       update_step="1")
+        self._add_warped_factorization(node, name="preconditioner")
+
+    def _add_warped_factorization(self, node, name):
+        """Direct factorisation wrapped by a WarpPreconditioner that reuses it for several steps."""
+        solver, template = DIRECT_SOLVERS[self.config.DIRECT_SOLVER]
+        node.addObject(solver, name="factorization", template=template)
+        node.addObject('WarpPreconditioner', name=name, linearSolver="@factorization",
+                       update_step=str(self.config.FACTORIZATION_UPDATE_STEPS))
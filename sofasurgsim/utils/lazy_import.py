@@ -0,0 +1,34 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Placeholder for a module that is imported on first attribute access.
+    Lets lightweight code paths (messages, offline tooling) import a module
+    that depends on heavy native packages without paying for them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    Returns a LazyModule for `name`.
+    Args:
+        name (str): Module name, e.g. 'roslibpy'
+    """
+    return LazyModule(name)
@@ -0,0 +1,148 @@
+import numpy as np
+
+_BITS = 21
+_MASK = (1 << _BITS) - 1
+_OFFSET = 1 << (_BITS - 1)
+
+
+def _pack(cells):
+    """Packs (n, 3) integer cell coordinates into int64 keys (21 bits per axis)."""
+    cells = (np.asarray(cells, dtype=np.int64) + _OFFSET) & _MASK
+    return (cells[..., 0] << (2 * _BITS)) | (cells[..., 1] << _BITS) | cells[..., 2]
+
+
+def _default_cell_size(positions, per_cell=2.0):
+    """
+    Cell edge giving about `per_cell` vertices per occupied cell.
+    Axes thinner than one cell do not count towards the volume: for a flat mesh the
+    bounding box volume goes to zero and would make the cells far too small.
+    """
+    extent = np.sort(np.ptp(positions, axis=0))[::-1] if len(positions) else np.zeros(3)
+    if extent[0] <= 0:
+        return 1.0
+    n_vertices = len(positions)
+    for dims in (3, 2, 1):
+        cell_size = (per_cell * np.prod(extent[:dims]) / n_vertices) ** (1.0 / dims)
+        if extent[dims - 1] >= cell_size > 0:
+            return float(cell_size)
+    return float(extent[0])
+
+
+class UniformGridIndex:
+    """
+    Uniform grid over a set of vertices for nearest-vertex, radius and box queries.
+    Vertices are sorted by cell key, so a cell lookup is a binary search and a query
+    only visits the cells overlapping its region instead of scanning every vertex.
+    update() moves the index to new positions and re-sorts only if some vertex changed cell.
+    """
+
+    def __init__(self, positions, cell_size=None):
+        """
+        Args:
+            positions (np.ndarray): (n_vertices, 3) positions
+            cell_size (float): Edge of the grid cells; by default about two vertices per cell
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        if cell_size is None:
+            cell_size = _default_cell_size(positions)
+        self.cell_size = float(cell_size)
+        self.refit(positions)
+
+    def _cells(self, positions):
+        return np.floor(positions / self.cell_size).astype(np.int64)
+
+    def refit(self, positions):
+        """Rebuild the index for new positions."""
+        self.positions = np.array(positions, dtype=np.float64).reshape(-1, 3)
+        cells = self._cells(self.positions)
+        self.keys = _pack(cells)
+        self._sort(cells)
+
+    def _sort(self, cells):
+        self.order = np.argsort(self.keys, kind='stable')
+        self.sorted_keys = self.keys[self.order]
+        self.cell_min = cells.min(axis=0) if len(cells) else np.zeros(3, dtype=np.int64)
+        self.cell_max = cells.max(axis=0) if len(cells) else np.zeros(3, dtype=np.int64)
+
+    def update(self, positions):
+        """
+        Move the index to new positions of the same vertices.
+        Returns:
+            int: Number of vertices that changed cell
+        """
+        self.positions = np.array(positions, dtype=np.float64).reshape(-1, 3)
+        cells = self._cells(self.positions)
+        keys = _pack(cells)
+        changed = int(np.count_nonzero(keys != self.keys))
+        if changed:
+            self.keys = keys
+            self._sort(cells)
+        return changed
+
+    def _candidates(self, lower, upper):
+        """Ids of the vertices in the cells overlapping the box [lower, upper]."""
+        # Limitato alle celle occupate; se restano più celle che vertici conviene la scansione completa
+        low = np.maximum(self._cells(np.asarray(lower, dtype=np.float64)), self.cell_min)
+        high = np.minimum(self._cells(np.asarray(upper, dtype=np.float64)), self.cell_max)
+        if np.any(high < low):
+            return np.empty(0, dtype=np.int64)
+        if np.prod(high - low + 1) > len(self.positions):
+            return np.arange(len(self.positions))
+        ranges = [np.arange(low[axis], high[axis] + 1) for axis in range(3)]
+        cells = np.stack(np.meshgrid(*ranges, indexing='ij'), axis=-1).reshape(-1, 3)
+        keys = _pack(cells)
+        starts = np.searchsorted(self.sorted_keys, keys, side='left')
+        ends = np.searchsorted(self.sorted_keys, keys, side='right')
+        nonempty = ends > starts
+        if not np.any(nonempty):
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.order[s:e] for s, e in zip(starts[nonempty], ends[nonempty])])
+
+    def box_query(self, lower, upper):
+        """Ids of the vertices inside the axis aligned box [lower, upper]."""
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        ids = self._candidates(lower, upper)
+        inside = np.all((self.positions[ids] >= lower) & (self.positions[ids] <= upper), axis=1)
+        return np.sort(ids[inside])
+
+    def radius_query(self, center, radius):
+        """Ids of the vertices within `radius` of `center`."""
+        center = np.asarray(center, dtype=np.float64)
+        ids = self._candidates(center - radius, center + radius)
+        distances = np.sum((self.positions[ids] - center) ** 2, axis=1)
+        return np.sort(ids[distances <= radius * radius])
+
+    def nearest(self, point, k=1):
+        """
+        The k vertices closest to `point`.
+        The search radius grows from one cell until it contains k vertices
+        and the k-th one is not farther than the searched radius.
+        Returns:
+            (np.ndarray, np.ndarray): ids and distances, closest first
+        """
+        point = np.asarray(point, dtype=np.float64)
+        k = min(k, len(self.positions))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        # Oltre questo raggio la sfera contiene sicuramente tutti i vertici
+        lower = self.cell_min * self.cell_size
+        upper = (self.cell_max + 1) * self.cell_size
+        max_radius = np.linalg.norm(np.maximum(np.abs(lower - point), np.abs(upper - point)))
+        radius = self.cell_size
+        while True:
+            ids = self._candidates(point - radius, point + radius)
+            if len(ids) >= k:
+                distances = np.linalg.norm(self.positions[ids] - point, axis=1)
+                closest = np.argsort(distances, kind='stable')[:k]
+                if distances[closest[-1]] <= radius or radius >= max_radius:
+                    return ids[closest], distances[closest]
+            radius *= 2.0
+
+    def query_points(self, points, radius):
+        """Union of the radius queries around several points (e.g. the robot links)."""
+        results = [self.radius_query(point, radius) for point in np.asarray(points).reshape(-1, 3)]
+        if not results:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(results))
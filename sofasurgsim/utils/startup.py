@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+
+from sofasurgsim.utils.tracing import tracer
+
+PHASES = ('import', 'connect', 'fetch', 'parse', 'scene_build', 'sofa_init', 'first_step')
+
+
+class StartupReport:
+    """
+    Breaks down the time from process start to the end of the first simulation step.
+    Phases can be nested: the time of an inner phase (e.g. 'fetch' inside 'scene_build')
+    is only counted in the inner one, so the phases add up to the total.
+    The report is only produced for processes whose entry point called set_start
+    (e.g. scripts/main.py), not for batch workers that build scenes on demand.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = OrderedDict((phase, 0.0) for phase in PHASES)
+        self.completed = False
+        self.active = False
+        self._first_step_start = None
+        self._stack = []
+
+    def set_start(self, start):
+        """
+        Use an earlier time.perf_counter() value (e.g. taken before the imports) as process start
+        and enable the report.
+        """
+        self.start = start
+        self.active = True
+
+    def add(self, phase, seconds):
+        """Add a duration measured elsewhere to a phase."""
+        self.durations[phase] = self.durations.get(phase, 0.0) + seconds
+
+    def phase(self, name):
+        """Context manager accumulating the exclusive time spent in the enclosed block."""
+        return _Phase(self, name)
+
+    def begin_first_step(self):
+        """Mark the beginning of the first simulation step."""
+        if self.active and self._first_step_start is None:
+            self._first_step_start = time.perf_counter()
+
+    def complete(self, logger):
+        """Log the report once, at the end of the first simulation step."""
+        if self.completed:
+            return
+        self.completed = True
+        if not self.active:
+            return
+        if self._first_step_start is not None:
+            self.add('first_step', time.perf_counter() - self._first_step_start)
+        total = time.perf_counter() - self.start
+        other = max(total - sum(self.durations.values()), 0.0)
+        breakdown = ", ".join(
+            f"{phase} {seconds * 1e3:.0f}ms ({100 * seconds / total:.0f}%)"
+            for phase, seconds in list(self.durations.items()) + [('other', other)]
+        )
+        logger.info(f"Time to first simulation step: {total:.2f}s | {breakdown}")
+
+
+class _Phase:
+    __slots__ = ('report', 'name', 'start', 'children')
+
+    def __init__(self, report, name):
+        self.report = report
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.children = 0.0
+        self.report._stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.report._stack.pop()
+        elapsed = end - self.start
+        self.report.add(self.name, elapsed - self.children)
+        if self.report._stack:
+            self.report._stack[-1].children += elapsed
+        if tracer.enabled:
+            tracer.record(f"startup.{self.name}", self.start, end)
+        return False
+
+
+startup_report = StartupReport()
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import atexit
+import threading
+import multiprocessing
+from collections import deque, defaultdict
+
+
+class _NullSpan:
+    """Span returned when tracing is disabled: entering and exiting it does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Timed span recorded by the tracer when it exits."""
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+def _percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Tracer:
+    """
+    Lightweight hot-path instrumentation.
+    Records timed spans and counters, exports them as a Chrome trace
+    (chrome://tracing, Perfetto) and periodically logs a metrics snapshot with
+    the step rate, p50/p99 latency of every stage and the published bytes.
+    When disabled, span() returns a shared no-op object and count() returns immediately.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.logger = None
+        self.trace_file = None
+        self.metrics_interval = 0
+        self._events = deque()
+        self._durations = defaultdict(deque)
+        self._window = 0
+        self._counters = defaultdict(float)
+        self._open = {}
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._steps = 0
+        self._last_snapshot_time = self._origin
+        self._last_snapshot_steps = 0
+        self._last_snapshot_counters = {}
+        self._exit_registered = False
+
+    def configure(self, config):
+        """
+        Enable or disable tracing from the configuration.
+        Args:
+            config (BaseConfig): uses TRACE_ENABLED, TRACE_FILE, TRACE_MAX_EVENTS, METRICS_INTERVAL, METRICS_WINDOW
+        """
+        self.enabled = config.TRACE_ENABLED
+        self.logger = config.logger
+        self.trace_file = self._process_trace_file(config.TRACE_FILE)
+        self.metrics_interval = config.METRICS_INTERVAL
+        self._window = config.METRICS_WINDOW
+        self._events = deque(self._events, maxlen=config.TRACE_MAX_EVENTS)
+        self._durations = defaultdict(lambda: deque(maxlen=self._window))
+
+        if self.enabled and self.trace_file and not self._exit_registered:
+            atexit.register(self._export_at_exit)
+            self._exit_registered = True
+
+    @staticmethod
+    def _process_trace_file(trace_file):
+        """
+        Trace file of this process: child processes (e.g. batch workers) write to
+        '<name>.<pid>.json' so that they do not overwrite each other's trace.
+        """
+        if not trace_file or multiprocessing.parent_process() is None:
+            return trace_file
+        root, ext = os.path.splitext(trace_file)
+        return f"{root}.{os.getpid()}{ext}"
+
+    def span(self, name):
+        """
+        Context manager timing the enclosed block.
+        Args:
+            name (str): Stage name, e.g. 'organ.end'
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def begin(self, name):
+        """Open a span whose end is marked elsewhere with end(name)."""
+        if self.enabled:
+            self._open[name] = time.perf_counter()
+
+    def end(self, name):
+        """Close a span opened with begin(name)."""
+        if self.enabled:
+            start = self._open.pop(name, None)
+            if start is not None:
+                self.record(name, start, time.perf_counter())
+
+    def count(self, name, value=1):
+        """Increment a counter (e.g. 'bytes_published')."""
+        if self.enabled:
+            with self._lock:
+                self._counters[name] += value
+
+    def record(self, name, start, end):
+        """Store a completed span; start and end are time.perf_counter() values."""
+        duration = end - start
+        with self._lock:
+            self._durations[name].append(duration)
+            self._events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': (start - self._origin) * 1e6,
+                'dur': duration * 1e6,
+                'pid': self._pid,
+                'tid': threading.get_ident()
+            })
+
+    def step_completed(self):
+        """Called once per simulation step; logs a snapshot every METRICS_INTERVAL seconds."""
+        if not self.enabled:
+            return
+        self._steps += 1
+        if self.metrics_interval and time.perf_counter() - self._last_snapshot_time >= self.metrics_interval:
+            self.log_snapshot()
+
+    def snapshot(self):
+        """
+        Metrics since the previous snapshot.
+        Returns:
+            dict: step_rate (steps/s), stages (p50/p99 latency in ms over the last
+                  METRICS_WINDOW samples), counters and their rate per second
+        """
+        now = time.perf_counter()
+        elapsed = max(now - self._last_snapshot_time, 1e-9)
+        with self._lock:
+            stages = {}
+            for name, durations in self._durations.items():
+                values = sorted(durations)
+                stages[name] = {
+                    'count': len(values),
+                    'p50_ms': _percentile(values, 50) * 1e3,
+                    'p99_ms': _percentile(values, 99) * 1e3
+                }
+            counters = dict(self._counters)
+
+        rates = {
+            name: (value - self._last_snapshot_counters.get(name, 0.0)) / elapsed
+            for name, value in counters.items()
+        }
+        snapshot = {
+            'step_rate': (self._steps - self._last_snapshot_steps) / elapsed,
+            'stages': stages,
+            'counters': counters,
+            'counter_rates': rates
+        }
+        self._last_snapshot_time = now
+        self._last_snapshot_steps = self._steps
+        self._last_snapshot_counters = counters
+        return snapshot
+
+    def log_snapshot(self):
+        """Log the current metrics snapshot."""
+        snapshot = self.snapshot()
+        stages = ", ".join(
+            f"{name} p50 {stats['p50_ms']:.2f}ms p99 {stats['p99_ms']:.2f}ms"
+            for name, stats in sorted(snapshot['stages'].items())
+        )
+        self.logger.info(
+            f"{snapshot['step_rate']:.1f} steps/s, "
+            f"{snapshot['counter_rates'].get('bytes_published', 0.0) / 1024:.1f} KiB/s published, "
+            f"{int(snapshot['counters'].get('idle_steps', 0))} idle steps | {stages}")
+        return snapshot
+
+    def _export_at_exit(self):
+        """Write the trace file at interpreter exit if tracing is still enabled."""
+        if self.enabled:
+            self.export_chrome_trace()
+
+    def export_chrome_trace(self, path=None):
+        """
+        Write the recorded spans as a Chrome trace JSON file.
+        Args:
+            path (str): Output file, TRACE_FILE by default
+        """
+        path = path if path else self.trace_file
+        if not path:
+            return
+        with self._lock:
+            events = list(self._events)
+            counters = dict(self._counters)
+        if counters:
+            events.append({
+                'name': 'counters',
+                'ph': 'C',
+                'ts': (time.perf_counter() - self._origin) * 1e6,
+                'pid': self._pid,
+                'args': counters
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        if self.logger:
+            self.logger.info(f"Trace written to {path} ({len(events)} events)")
+
+
+tracer = Tracer()